@@ -89,6 +89,7 @@ def main():
         print("  python auth_helper.py test <token> <user>      # Testa acesso vulnerável")
         print("  python auth_helper.py test-secure <token> <user> # Testa acesso seguro")
         print("  python auth_helper.py demo                     # Demonstração completa")
+        print("  python auth_helper.py bench [opções]           # Teste de carga (ver bench --help)")
         print()
         print("Usuários de teste:")
         print("  - alice / alice123")
@@ -167,6 +168,10 @@ def main():
         print("   - Servidor vulnerável permite acesso cross-user")
         print("   - Servidor seguro bloqueia acesso não autorizado")
     
+    elif command == "bench":
+        from load_bench import main as bench_main
+        bench_main(sys.argv[2:])
+    
     else:
         print(f"❌ Comando desconhecido: {command}")
 
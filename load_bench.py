@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga HTTP para os servidores do workshop
+
+Dispara os cenários abaixo com concorrência configurável, usando um único
+httpx.AsyncClient com conexões keep-alive:
+- login            POST /login (servidor de autenticação)
+- me               GET /me
+- profile          GET /profile?username=... (A01)
+- change-password  POST /change-password e /change-password-secure (A02),
+                   regravando a mesma senha para não quebrar os logins
+- search           GET /search (A03)
+
+Respostas 429 (limite de taxa do rate_limit.py, ligado por padrão no
+/login) são contadas à parte em "429" e não entram nas latências nem em
+ok_rps. Para medir a capacidade dos servidores, e não o limitador, rode-os
+com RATE_LIMIT_ENABLED=0.
+
+Modos:
+- closed (padrão): `--concurrency` workers, cada um envia a próxima
+  requisição assim que recebe a resposta anterior
+- open: taxa fixa de `--rate` req/s, independente das respostas; a latência
+  é medida a partir do instante planejado (sem coordinated omission)
+
+Uso:
+    python auth_helper.py bench --mix me=5,profile=3,login=1 --concurrency 50 --duration 30
+    python auth_helper.py bench --mode open --rate 500 --ramp-up 10 --json run.json
+    python auth_helper.py bench --mix search=1 --compare run.json
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import random
+import sys
+import time
+from array import array
+
+import httpx
+
+SCENARIOS = ("login", "me", "profile", "change-password", "change-password-secure", "search")
+DEFAULT_MIX = "login=1,me=4,profile=4,search=2"
+DEFAULT_USERS = ["alice:alice123", "bob:bob123"]
+SEARCH_TERMS = ["lap", "phone", "book", "tab", "head"]
+
+
+class Recorder:
+    """Acumula latências (ms), erros e respostas 429 de um cenário"""
+
+    def __init__(self):
+        self.latencies = array("d")
+        self.errors = {}
+        self.throttled = 0
+
+    def record(self, latency_ms, error=None):
+        if error is None:
+            self.latencies.append(latency_ms)
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.throttled += other.throttled
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        errors = sum(self.errors.values())
+        requests = count + errors + self.throttled
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(count - 1, max(0, math.ceil(p / 100 * count) - 1))]
+
+        return {
+            "requests": requests,
+            "ok": count,
+            "throttled": self.throttled,
+            "errors": dict(sorted(self.errors.items())),
+            "throughput_rps": requests / elapsed if elapsed else 0.0,
+            "ok_rps": count / elapsed if elapsed else 0.0,
+            "mean_ms": sum(latencies) / count if count else None,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": latencies[-1] if latencies else None,
+            "histogram": histogram(latencies),
+        }
+
+
+def histogram(sorted_latencies):
+    """Contagem por faixa de latência em potências de 2 (ms): {"<=1": n, "<=2": n, ...}"""
+    if not sorted_latencies:
+        return {}
+    buckets = {}
+    bound = 1.0
+    start = 0
+    while start < len(sorted_latencies):
+        end = bisect.bisect_right(sorted_latencies, bound, lo=start)
+        buckets[f"<={bound:g}"] = end - start
+        start = end
+        bound *= 2
+    return buckets
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.users = [user.split(":", 1) for user in args.user or DEFAULT_USERS]
+        self.tokens = {}
+        self.recorders = {name: Recorder() for name in self.mix}
+        self.rng = random.Random(args.seed)
+        self.client = None
+        self._names = list(self.mix)
+        self._weights = [self.mix[name] for name in self._names]
+
+    # Cenários ---------------------------------------------------------------
+
+    def _user(self):
+        return self.rng.choice(self.users)
+
+    def _auth(self, username):
+        return {"Authorization": f"Bearer {self.tokens[username]}"}
+
+    def request_for(self, name):
+        """Retorna (método, url, kwargs) de uma requisição do cenário `name`"""
+        args = self.args
+        username, password = self._user()
+        if name == "login":
+            return "POST", f"{args.auth_url}/login", {"json": {"username": username, "password": password}}
+        if name == "me":
+            return "GET", f"{args.auth_url}/me", {"headers": self._auth(username)}
+        if name == "profile":
+            return "GET", f"{args.profile_url}/profile", {
+                "params": {"username": username}, "headers": self._auth(username)
+            }
+        if name in ("change-password", "change-password-secure"):
+            url = args.a02_url if name == "change-password" else args.a02_secure_url
+            return "POST", f"{url}/{name}", {
+                "json": {"new_password": password}, "headers": self._auth(username)
+            }
+        if name == "search":
+            return "GET", f"{args.a03_url}/search", {"params": {"name": self.rng.choice(SEARCH_TERMS)}}
+        raise ValueError(f"Cenário desconhecido: {name}")
+
+    async def login_all(self):
+        """Obtém um token por usuário para os cenários autenticados"""
+        for username, password in self.users:
+            response = await self.client.post(
+                f"{self.args.auth_url}/login", json={"username": username, "password": password}
+            )
+            response.raise_for_status()
+            self.tokens[username] = response.json()["access_token"]
+
+    async def send(self, name, started=None):
+        method, url, kwargs = self.request_for(name)
+        started = time.perf_counter() if started is None else started
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorders[name].record(None, type(e).__name__)
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        if response.status_code == 429:
+            # Recusada pelo limite de taxa: não é latência nem erro do servidor
+            self.recorders[name].throttled += 1
+        elif response.status_code >= 400:
+            self.recorders[name].record(None, f"HTTP {response.status_code}")
+        else:
+            self.recorders[name].record(latency_ms)
+
+    def pick(self):
+        return self.rng.choices(self._names, self._weights)[0]
+
+    # Modos ------------------------------------------------------------------
+
+    async def run_closed(self, deadline):
+        args = self.args
+
+        async def worker(index):
+            # Ramp-up: os workers entram em intervalos regulares
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up * index / args.concurrency)
+            while time.perf_counter() < deadline:
+                await self.send(self.pick())
+
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+
+    def scheduled_offset(self, index):
+        """
+        Instante (s desde o início) da requisição `index` no modo open
+
+        Com ramp-up a taxa cresce linearmente de 0 a --rate em T segundos:
+        até T já foram enviadas rate*t²/(2T) requisições, depois rate por segundo.
+        """
+        rate, ramp_up = self.args.rate, self.args.ramp_up
+        ramp_requests = rate * ramp_up / 2
+        if index < ramp_requests:
+            return math.sqrt(2 * ramp_up * index / rate)
+        return ramp_up + (index - ramp_requests) / rate
+
+    async def run_open(self, start, deadline):
+        args = self.args
+        # Limita as requisições em andamento (servidor saturado não esgota a memória)
+        in_flight = asyncio.Semaphore(args.concurrency)
+        tasks = set()
+
+        async def fire(name, scheduled):
+            try:
+                await self.send(name, started=scheduled)
+            finally:
+                in_flight.release()
+
+        sent = 0
+        while True:
+            scheduled = start + self.scheduled_offset(sent)
+            if scheduled >= deadline:
+                break
+            sent += 1
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            task = asyncio.create_task(fire(self.pick(), scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+    async def run(self):
+        args = self.args
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+            self.client = client
+            if set(self.mix) - {"login", "search"}:
+                await self.login_all()
+            start = time.perf_counter()
+            deadline = start + args.duration
+            if args.mode == "open":
+                await self.run_open(start, deadline)
+            else:
+                await self.run_closed(deadline)
+            return time.perf_counter() - start
+
+    def report(self, elapsed):
+        total = Recorder()
+        for recorder in self.recorders.values():
+            total.merge(recorder)
+        return {
+            "config": {
+                "mode": self.args.mode,
+                "mix": self.mix,
+                "concurrency": self.args.concurrency,
+                "rate": self.args.rate,
+                "duration_s": self.args.duration,
+                "ramp_up_s": self.args.ramp_up,
+            },
+            "elapsed_s": elapsed,
+            "total": total.summary(elapsed),
+            "scenarios": {name: recorder.summary(elapsed) for name, recorder in self.recorders.items()},
+        }
+
+
+def parse_mix(text):
+    """"login=1,me=4" -> {"login": 1.0, "me": 4.0}; ValueError se algo for inválido"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"cenário desconhecido: {name!r} (opções: {', '.join(SCENARIOS)})")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f"peso inválido para {name}: {weight!r}")
+        if mix[name] < 0:
+            raise ValueError(f"peso negativo para {name}: {weight}")
+    if not any(mix.values()):
+        raise ValueError("a mistura precisa de ao menos um cenário com peso > 0")
+    return mix
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:8.2f}"
+
+
+def print_report(report, baseline=None):
+    print(f"\n📊 {report['config']['mode']} loop, {report['elapsed_s']:.1f}s")
+    print(f"   {'cenário':<24}{'req':>8}{'ok/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'429':>8}  erros")
+    rows = list(report["scenarios"].items()) + [("TOTAL", report["total"])]
+    for name, summary in rows:
+        print(
+            f"   {name:<24}{summary['requests']:>8}{summary['ok_rps']:>10.1f}"
+            f"{_ms(summary['p50_ms']):>10}{_ms(summary['p95_ms']):>10}"
+            f"{_ms(summary['p99_ms']):>10}{_ms(summary['max_ms']):>10}"
+            f"{summary['throttled']:>8}  {sum(summary['errors'].values())}"
+        )
+
+    total = report["total"]
+    if total["throttled"]:
+        share = 100 * total["throttled"] / total["requests"]
+        print(f"\n⚠️  {total['throttled']} respostas 429 ({share:.1f}%): o limite de taxa recusou parte da carga.")
+        print("   Para medir os servidores, rode-os com RATE_LIMIT_ENABLED=0.")
+    if total["errors"]:
+        print("\n❌ Erros:")
+        for error, count in total["errors"].items():
+            print(f"   {error}: {count}")
+
+    if total["histogram"]:
+        print("\n📈 Histograma de latência (ms):")
+        peak = max(total["histogram"].values())
+        for bucket, count in total["histogram"].items():
+            bar = "█" * (round(40 * count / peak) if peak else 0)
+            print(f"   {bucket:>10} {count:>8} {bar}")
+
+    if baseline:
+        print("\n🔁 Comparação com a execução anterior:")
+        for key in ("ok_rps", "p50_ms", "p95_ms", "p99_ms"):
+            old, new = baseline["total"].get(key), total.get(key)
+            if old and new is not None:
+                print(f"   {key:<16}{old:>10.2f} -> {new:>10.2f}  ({(new - old) / old * 100:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP dos servidores do workshop")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Pesos dos cenários: {', '.join(SCENARIOS)} (ex: me=5,login=1)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=20,
+                        help="Workers (closed) ou máximo de requisições em andamento (open)")
+    parser.add_argument("--rate", type=float, default=100, help="Requisições/s no modo open")
+    parser.add_argument("--duration", type=float, default=10, help="Duração em segundos")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Segundos até a carga total")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=None, help="Semente da escolha de cenários")
+    parser.add_argument("--user", action="append", help="usuario:senha (padrão: alice e bob)")
+    parser.add_argument("--auth-url", default="http://localhost:8000")
+    parser.add_argument("--profile-url", default="http://localhost:8001")
+    parser.add_argument("--a02-url", default="http://localhost:8003")
+    parser.add_argument("--a02-secure-url", default="http://localhost:8004")
+    parser.add_argument("--a03-url", default="http://localhost:8006")
+    parser.add_argument("--json", dest="json_path", help="Salva o relatório em JSON")
+    parser.add_argument("--compare", help="Relatório JSON anterior para comparação")
+    args = parser.parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(f"--mix: {e}")
+
+    bench = Bench(args)
+    print(f"🚀 Carga {args.mode} por {args.duration:.0f}s: {args.mix}")
+    try:
+        elapsed = asyncio.run(bench.run())
+    except httpx.HTTPError as e:
+        print(f"❌ Erro ao preparar o teste: {e}")
+        sys.exit(1)
+
+    report = bench.report(elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Relatório salvo em {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
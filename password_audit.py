@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Auditoria offline de senhas fracas nos hashes MD5 exportados
+
+Uso exclusivo em revisões autorizadas de força de senha. Compara uma wordlist
+com os hashes de um export do /all-data (JSON ou NDJSON):
+
+    curl "http://localhost:8003/all-data?format=ndjson" > export.ndjson
+    python password_audit.py export.ndjson rockyou.txt --workers 8
+
+A wordlist é lida via mmap e dividida em faixas de bytes (alinhadas em quebras
+de linha) processadas por um pool de processos. Cada processo mapeia apenas a
+sua faixa, então a memória usada não depende do tamanho da wordlist. Os hashes
+alvo ficam em um set de digests de 16 bytes em cada processo.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows não tem o módulo resource
+    resource = None
+
+# Tamanho de cada faixa de bytes entregue a um processo
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Digests alvo, definidos no inicializador de cada processo do pool
+_targets = frozenset()
+
+
+def load_targets(export_path):
+    """
+    Lê o export e retorna {digest MD5 (bytes): [usernames]}
+
+    Hashes que não são MD5 (bcrypt, bcrypt-md5, ...) são ignorados: com salt
+    não há como compará-los em lote.
+    """
+    with open(export_path, encoding="utf-8") as f:
+        if export_path.endswith(".json"):
+            users = json.load(f)["users"]
+        else:
+            users = (json.loads(line) for line in f if line.strip())
+        targets = {}
+        for user in users:
+            password = user.get("password") or ""
+            if len(password) != 32:
+                continue
+            try:
+                digest = bytes.fromhex(password)
+            except ValueError:
+                continue
+            targets.setdefault(digest, []).append(user["username"])
+    return targets
+
+
+def split_ranges(path, chunk_bytes):
+    """Divide o arquivo em faixas [início, fim) terminando em quebras de linha"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if end == -1 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _init_worker(targets):
+    global _targets
+    _targets = targets
+
+
+def audit_range(path, start, end):
+    """
+    Calcula o MD5 de cada linha da faixa e retorna (linhas, encontrados)
+
+    md5(linha em bytes) equivale a crypto.hash_md5(senha) para wordlists
+    em UTF-8, sem decodificar cada linha.
+    """
+    md5 = hashlib.md5
+    targets = _targets
+    found = []
+    count = 0
+    offset = start - start % mmap.ALLOCATIONGRANULARITY
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), end - offset, offset=offset, access=mmap.ACCESS_READ
+    ) as mm:
+        for line in mm[start - offset:].split(b"\n"):
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            if not line:
+                continue
+            count += 1
+            digest = md5(line).digest()
+            if digest in targets:
+                found.append((line, digest))
+    return count, found
+
+
+def peak_rss_mb():
+    """Pico de memória residente (MB) deste processo e dos processos filhos"""
+    if resource is None:
+        return None, None
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return own, children
+
+
+def run_audit(export_path, wordlist_path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES, progress=None):
+    """Executa a auditoria e retorna um dict com os encontrados e as métricas"""
+    targets = load_targets(export_path)
+    ranges = split_ranges(wordlist_path, chunk_bytes)
+    matches = {}
+    hashed = 0
+    started = time.perf_counter()
+    if targets and ranges:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(frozenset(targets),),
+        ) as executor:
+            paths = [wordlist_path] * len(ranges)
+            starts = [start for start, _ in ranges]
+            ends = [end for _, end in ranges]
+            for done, (count, found) in enumerate(executor.map(audit_range, paths, starts, ends), 1):
+                hashed += count
+                for line, digest in found:
+                    password = line.decode("utf-8", errors="replace")
+                    matches[password] = targets[digest]
+                if progress:
+                    progress(done, len(ranges), hashed, time.perf_counter() - started)
+    elapsed = time.perf_counter() - started
+    own_rss, children_rss = peak_rss_mb()
+    return {
+        "targets": len(targets),
+        "hashed": hashed,
+        "elapsed_s": elapsed,
+        "hashes_per_sec": hashed / elapsed if elapsed else 0.0,
+        "peak_rss_mb": own_rss,
+        "peak_rss_worker_mb": children_rss,
+        "matches": matches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Auditoria offline de hashes MD5 com wordlist (mmap)")
+    parser.add_argument("export", help="Export do /all-data (.json ou .ndjson)")
+    parser.add_argument("wordlist", help="Wordlist, uma senha por linha")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de hashing (padrão: núcleos)")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / (1024 * 1024),
+                        help="Tamanho de cada faixa da wordlist em MB")
+    parser.add_argument("--json", dest="json_path", help="Salva o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    def progress(done, total, hashed, elapsed):
+        rate = hashed / elapsed if elapsed else 0.0
+        print(f"\r   {done}/{total} faixas  {hashed:,} hashes  {rate:,.0f} hashes/s", end="", flush=True)
+
+    print("🔍 Auditando senhas...")
+    report = run_audit(
+        args.export, args.wordlist,
+        workers=args.workers,
+        chunk_bytes=max(1, int(args.chunk_mb * 1024 * 1024)),
+        progress=progress,
+    )
+    print()
+    print(f"   Hashes alvo: {report['targets']}")
+    print(f"   Senhas testadas: {report['hashed']:,} em {report['elapsed_s']:.2f}s")
+    print(f"   Throughput: {report['hashes_per_sec']:,.0f} hashes/s")
+    if report["peak_rss_mb"] is not None:
+        print(f"   Pico de RSS: {report['peak_rss_mb']:.1f} MB (processo principal), "
+              f"{report['peak_rss_worker_mb']:.1f} MB (maior processo do pool)")
+
+    if report["matches"]:
+        print(f"\n⚠️  {len(report['matches'])} senhas fracas encontradas:")
+        for password, usernames in sorted(report["matches"].items()):
+            print(f"   - {password!r}: {', '.join(usernames)}")
+    else:
+        print("\n✅ Nenhuma senha da wordlist encontrada")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Relatório salvo em {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
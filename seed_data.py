@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Gerador de dados sintéticos para testes de carga
+
+Preenche as tabelas com milhões de linhas com distribuições realistas, para
+reproduzir os planos de consulta de produção:
+- senhas: um conjunto de senhas distintas com popularidade de cauda longa
+  (poucas senhas muito repetidas), cada uma com hash calculado uma única vez
+  em paralelo em um pool de processos
+- idades em torno de 35 anos, preços log-normais, categorias com pesos
+
+Os dados dependem apenas de --seed (random.Random), então duas execuções
+com a mesma semente geram as mesmas linhas (exceto o salt dos hashes bcrypt).
+
+Uso:
+    python seed_data.py postgres --users 10000000
+    python seed_data.py sqlite src/a03_injection/secure_app.db --users 100000 --products 1000000
+
+PostgreSQL (tabela users do servidor de autenticação) usa COPY FROM STDIN;
+SQLite (bancos do A03) usa inserts em lote, uma transação por lote. Os bancos
+do A03 são restaurados do template a cada inicialização: semeie com o
+servidor rodando ou use A03_TEMPLATE_EXTRA_PRODUCTS.
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "shared"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "a03_injection"))
+
+from dotenv import load_dotenv
+
+from database import create_search_index, template_connection
+from hashers import get_hasher
+
+load_dotenv()
+
+DEFAULT_BATCH_SIZE = 50000
+DEFAULT_DISTINCT_PASSWORDS = 10000
+
+WORDS = [
+    "amor", "brasil", "dragon", "futebol", "flamengo", "jesus", "monkey", "password",
+    "princesa", "qwerty", "senha", "shadow", "sunshine", "master", "welcome", "corinthians",
+]
+PRODUCT_CATEGORIES = ["electronics", "books", "clothing", "home", "toys", "sports", "garden", "beauty"]
+CATEGORY_WEIGHTS = [30, 20, 15, 12, 8, 7, 5, 3]
+PRODUCT_NOUNS = ["Laptop", "Phone", "Book", "Headphones", "Tablet", "Camera", "Chair", "Lamp", "Shoes", "Watch"]
+PRODUCT_ADJECTIVES = ["Pro", "Mini", "Max", "Ultra", "Classic", "Smart", "Portable", "Wireless"]
+
+
+def generate_passwords(rng, count):
+    """Senhas distintas no estilo das listas vazadas (palavra + números)"""
+    passwords = []
+    seen = set()
+    while len(passwords) < count:
+        password = f"{rng.choice(WORDS)}{rng.randint(0, 9999)}"
+        if password not in seen:
+            seen.add(password)
+            passwords.append(password)
+    return passwords
+
+
+def _hash_batch(args):
+    scheme, cost, passwords = args
+    hasher = get_hasher(scheme, cost)
+    return [hasher.hash(password) for password in passwords]
+
+
+def hash_passwords(passwords, scheme, cost=None, workers=None):
+    """Calcula os hashes das senhas distintas em paralelo; retorna lista na mesma ordem"""
+    workers = workers or os.cpu_count() or 1
+    size = max(1, math.ceil(len(passwords) / (workers * 4)))
+    batches = [(scheme, cost, passwords[i:i + size]) for i in range(0, len(passwords), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [hashed for batch in executor.map(_hash_batch, batches) for hashed in batch]
+
+
+def password_index(rng, count):
+    """Índice de senha com popularidade de cauda longa (Pareto)"""
+    return min(int(rng.paretovariate(1.1)) - 1, count - 1)
+
+
+def generate_users(seed, count, hashes, plaintexts=None, prefix="seed"):
+    """
+    Gera (username, senha, idade, cartão) para `count` usuários
+
+    `hashes` é a senha armazenada de cada senha distinta; `plaintexts`, se
+    informado, é usado no lugar (a tabela do A03 guarda texto puro).
+    """
+    rng = random.Random(seed)
+    stored = plaintexts or hashes
+    for i in range(count):
+        age = min(90, max(18, int(rng.gauss(35, 12))))
+        card = f"{rng.randrange(10 ** 15, 10 ** 16)}"
+        yield f"{prefix}_{seed}_{i}", stored[password_index(rng, len(stored))], age, card
+
+
+def generate_products(seed, count):
+    """Gera (nome, categoria, preço, descrição) para `count` produtos"""
+    rng = random.Random(seed + 1)
+    for i in range(count):
+        category = rng.choices(PRODUCT_CATEGORIES, CATEGORY_WEIGHTS)[0]
+        name = f"{rng.choice(PRODUCT_NOUNS)} {rng.choice(PRODUCT_ADJECTIVES)} {i}"
+        price = round(min(20000.0, rng.lognormvariate(4, 1.2)), 2)
+        yield name, category, price, f"{category.capitalize()} item {i} (seed {seed})"
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _progress(label, started):
+    def report(done):
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0.0
+        print(f"\r   {label}: {done:,} linhas ({rate:,.0f} linhas/s)", end="", flush=True)
+    return report
+
+
+def check_password_column(cursor, scheme, cost):
+    """
+    Falha se users.password não comporta os hashes de `scheme`
+
+    A tabela do workshop nasce com VARCHAR(32) (só MD5); bcrypt e afins
+    precisam de VARCHAR(255), criado por rehash_migration.ensure_schema.
+    """
+    cursor.execute(
+        """
+        SELECT character_maximum_length FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'users' AND column_name = 'password'
+        """
+    )
+    row = cursor.fetchone()
+    width = row[0] if row else None
+    needed = len(get_hasher(scheme, cost).hash("seed"))
+    if width is not None and width < needed:
+        raise ValueError(
+            f"users.password é VARCHAR({width}), mas hashes {scheme} têm {needed} caracteres: "
+            "rode `python src/shared/rehash_migration.py` (ensure_schema alarga a coluna "
+            "para VARCHAR(255)) ou use --hasher md5"
+        )
+
+
+def seed_postgres(dsn, users, seed, scheme, cost, distinct, batch_size, workers, truncate):
+    """Insere usuários na tabela users com COPY FROM STDIN, um COPY por lote"""
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    username VARCHAR(50) UNIQUE NOT NULL,
+                    password VARCHAR(255) NOT NULL,
+                    age INTEGER,
+                    credit_card_number VARCHAR(16)
+                )
+                """
+            )
+            # Antes do hashing (que pode levar minutos) e do primeiro COPY
+            check_password_column(cursor, scheme, cost)
+            if truncate:
+                cursor.execute("DELETE FROM users WHERE username LIKE %s", (f"seed\\_{seed}\\_%",))
+        conn.commit()
+
+        rng = random.Random(seed)
+        passwords = generate_passwords(rng, distinct)
+        print(f"🔐 Calculando {len(passwords):,} hashes {scheme} em paralelo...")
+        hashes = hash_passwords(passwords, scheme, cost, workers)
+
+        report = _progress("users", time.monotonic())
+        done = 0
+        for batch in _batches(generate_users(seed, users, hashes), batch_size):
+            buffer = io.StringIO()
+            buffer.writelines(f"{u}\t{p}\t{a}\t{c}\n" for u, p, a, c in batch)
+            buffer.seek(0)
+            with conn.cursor() as cursor:
+                cursor.copy_expert(
+                    "COPY users (username, password, age, credit_card_number) FROM STDIN",
+                    buffer,
+                )
+            conn.commit()
+            done += len(batch)
+            report(done)
+        print()
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE users")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def seed_sqlite(path, users, products, seed, distinct, batch_size, truncate):
+    """Insere usuários e produtos nas tabelas do A03, uma transação por lote"""
+    rng = random.Random(seed)
+    passwords = generate_passwords(rng, distinct)
+
+    conn = sqlite3.connect(path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'users'").fetchone():
+            # Banco novo: parte do template do A03 (esquema + dados de exemplo)
+            template = template_connection()
+            template.backup(conn)
+            template.close()
+        # Carga em massa: o arquivo pode ser refeito se a carga falhar
+        conn.execute("PRAGMA synchronous=OFF")
+        if truncate:
+            conn.execute("DELETE FROM users WHERE username LIKE ? ESCAPE '\\'", (f"seed\\_{seed}\\_%",))
+            conn.execute("DELETE FROM products WHERE description LIKE ?", (f"% (seed {seed})",))
+            conn.commit()
+
+        report = _progress("users", time.monotonic())
+        done = 0
+        rows = generate_users(seed, users, passwords, plaintexts=passwords)
+        for batch in _batches(rows, batch_size):
+            with conn:
+                conn.executemany(
+                    "INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, 'user')",
+                    [(u, p, f"{u}@example.com") for u, p, _, _ in batch],
+                )
+            done += len(batch)
+            report(done)
+        print()
+
+        # Gatilhos e índices de busca por linha deixam a carga ~5x mais lenta:
+        # são removidos e recriados (com rebuild do full-text) no final
+        search_objects = conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE type IN ('trigger', 'index')"
+            " AND tbl_name = 'products' AND sql IS NOT NULL"
+        ).fetchall()
+        for object_type, name in search_objects:
+            conn.execute(f"DROP {object_type.upper()} {name}")
+        conn.commit()
+
+        report = _progress("products", time.monotonic())
+        done = 0
+        for batch in _batches(generate_products(seed, products), batch_size):
+            with conn:
+                conn.executemany(
+                    "INSERT INTO products (name, category, price, description) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+            done += len(batch)
+            report(done)
+        print()
+        if search_objects:
+            print("   🔎 Recriando índices de busca...")
+            create_search_index(conn)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--seed", type=int, default=42, help="Semente (dados determinísticos)")
+    common.add_argument("--users", type=int, default=100000)
+    common.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    common.add_argument("--distinct-passwords", type=int, default=DEFAULT_DISTINCT_PASSWORDS)
+    common.add_argument("--truncate", action="store_true", help="Remove os dados desta semente antes")
+
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para testes de carga")
+    subparsers = parser.add_subparsers(dest="target", required=True)
+
+    postgres = subparsers.add_parser("postgres", parents=[common], help="Tabela users do servidor de autenticação")
+    postgres.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    postgres.add_argument("--hasher", default="md5", help="Algoritmo das senhas (padrão: md5, como o workshop)")
+    postgres.add_argument("--cost", type=int, default=None, help="Custo do hash (ex: rounds do bcrypt)")
+    postgres.add_argument("--workers", type=int, default=None, help="Processos de hashing")
+
+    sqlite = subparsers.add_parser("sqlite", parents=[common], help="Banco SQLite do A03")
+    sqlite.add_argument("path", help="Arquivo do banco (ex: src/a03_injection/secure_app.db)")
+    sqlite.add_argument("--products", type=int, default=100000)
+
+    args = parser.parse_args(argv)
+    started = time.monotonic()
+
+    if args.target == "postgres":
+        if not args.dsn:
+            parser.error("defina DATABASE_URL ou use --dsn")
+        try:
+            seed_postgres(
+                args.dsn, args.users, args.seed, args.hasher, args.cost,
+                args.distinct_passwords, args.batch_size, args.workers, args.truncate,
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        total = args.users
+    else:
+        seed_sqlite(
+            args.path, args.users, args.products, args.seed,
+            args.distinct_passwords, args.batch_size, args.truncate,
+        )
+        total = args.users + args.products
+
+    print(f"🎯 {total:,} linhas geradas em {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
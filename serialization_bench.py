@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark do caminho rápido de serialização JSON (src/shared/fast_json.py)
+
+Executa as rotas em processo (TestClient, sem rede e sem PostgreSQL) com o
+caminho rápido desligado e ligado, e mede o tempo de CPU por requisição:
+- profile  GET /profile do A01 seguro (perfil vindo do cache de perfis)
+- me       GET /me do servidor de autenticação (idem)
+- search   GET /search?name=... do A03 seguro (FTS, 100 produtos)
+- users    GET /users?limit=100 do A03 seguro
+
+Os bancos do A03 ficam em memória (A03_DB_MEMORY=1) e o template recebe
+produtos sintéticos para a busca retornar páginas cheias.
+
+Uso:
+    python serialization_bench.py --requests 3000
+    python serialization_bench.py --scenario search --json serialization.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# Precisam estar definidos antes de importar as aplicações
+os.environ.setdefault("JWT_SECRET", "serialization-bench")
+os.environ.setdefault("A03_DB_MEMORY", "1")
+os.environ.setdefault("A03_TEMPLATE_EXTRA_PRODUCTS", "2000")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "shared"))
+
+import jwt  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import fast_json  # noqa: E402
+from gateway import load_app  # noqa: E402
+from profile_cache import profile_cache  # noqa: E402
+
+PROFILE = {"id": 1, "username": "alice", "age": 30}
+
+
+def scenarios():
+    """nome -> (aplicação, caminho, headers)"""
+    from auth import JWT_ALGORITHM, JWT_SECRET
+
+    headers = {"Authorization": f"Bearer {jwt.encode({'sub': 'alice'}, JWT_SECRET, algorithm=JWT_ALGORITHM)}"}
+    a03 = load_app("a03_injection/solution.py", "app")
+    return {
+        "profile": (load_app("a01_access_control/solution.py", "create_secure_app"), "/profile?username=alice", headers),
+        "me": (load_app("shared/auth_server.py", "build_auth_server"), "/me", headers),
+        "search": (a03, "/search?name=item&limit=100", {}),
+        "users": (a03, "/users?limit=100", {}),
+    }
+
+
+def measure(client, path, headers, requests):
+    """Retorna (CPU µs/req, latência µs/req, bytes da resposta)"""
+    for _ in range(min(200, requests)):
+        response = client.get(path, headers=headers)
+        response.raise_for_status()
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    return cpu / requests * 1e6, wall / requests * 1e6, len(response.content)
+
+
+def run(names, requests):
+    results = {}
+    for name, (app, path, headers) in scenarios().items():
+        if name not in names:
+            continue
+        with TestClient(app) as client:
+            result = {}
+            for mode, enabled in (("padrao", False), ("rapido", True)):
+                fast_json.FAST_JSON = enabled
+                profile_cache.set("alice", dict(PROFILE))
+                cpu_us, wall_us, size = measure(client, path, headers, requests)
+                result[mode] = {"cpu_us": round(cpu_us, 1), "latencia_us": round(wall_us, 1), "bytes": size}
+            result["cpu_economizada_pct"] = round(
+                100 * (1 - result["rapido"]["cpu_us"] / result["padrao"]["cpu_us"]), 1
+            )
+            results[name] = result
+    return results
+
+
+def print_report(results, requests):
+    encoder = "orjson" if fast_json.orjson is not None else "json (orjson não instalado)"
+    print(f"Encoder: {encoder} | {requests} requisições por modo")
+    print(f"{'cenário':<10} {'CPU padrão':>12} {'CPU rápido':>12} {'economia':>9} {'bytes':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['padrao']['cpu_us']:>10.1f}µs {result['rapido']['cpu_us']:>10.1f}µs "
+            f"{result['cpu_economizada_pct']:>8.1f}% {result['rapido']['bytes']:>8}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da serialização JSON das rotas")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições medidas por modo")
+    parser.add_argument("--scenario", action="append", choices=["profile", "me", "search", "users"],
+                        help="Cenários a executar (padrão: todos)")
+    parser.add_argument("--json", dest="json_path", help="Salva o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    names = set(args.scenario or ["profile", "me", "search", "users"])
+    results = run(names, args.requests)
+    print_report(results, args.requests)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"requests": args.requests, "resultados": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,8 @@ import os
 # Adiciona o diretório shared ao path para importar módulos compartilhados
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from auth import build_server, get_current_user, db, User
+from auth import build_server, get_current_user, async_db, get_user_profile, User
+from fast_json import trusted_response
 
 app = build_server()
 
@@ -36,21 +37,16 @@ async def get_profile(
     autenticado para buscar as informações do perfil.
     """
     # VULNERÁVEL: Usa o username da query, não do usuário autenticado
-    query = "SELECT id, username, age FROM users WHERE username = %s"
-    users = db.execute_query(query, (username,))
+    user_data = await get_user_profile(async_db, username)
     
-    if not users:
+    if not user_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user_data = users[0]
-    return User(
-        id=user_data['id'],
-        username=user_data['username'],
-        age=user_data['age']
-    )
+    # Linha do banco: serializada direto, sem validar de novo
+    return trusted_response(user_data, User)
 
 @app.get("/")
 async def root():
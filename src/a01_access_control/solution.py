@@ -6,7 +6,8 @@ import os
 # Adiciona o diretório shared ao path para importar módulos compartilhados
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from auth import build_server, get_current_user, db, User
+from auth import build_server, get_current_user, async_db, get_user_profile, User
+from fast_json import trusted_response
 
 def create_secure_app():
     """
@@ -40,21 +41,16 @@ def create_secure_app():
             )
         
         # CORREÇÃO 2: Usa o username do usuário autenticado, não do parâmetro da query
-        query = "SELECT id, username, age FROM users WHERE username = %s"
-        users = db.execute_query(query, (authenticated_username,))
+        user_data = await get_user_profile(async_db, authenticated_username)
         
-        if not users:
+        if not user_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user_data = users[0]
-        return User(
-            id=user_data['id'],
-            username=user_data['username'],
-            age=user_data['age']
-        )
+        # Linha do banco: serializada direto, sem validar de novo
+        return trusted_response(user_data, User)
 
     @app.get("/")
     async def root():
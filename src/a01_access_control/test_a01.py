@@ -11,6 +11,7 @@ load_dotenv()
 # Importa os servidores
 from .server import app as vulnerable_app
 from .solution import create_secure_app
+from auth import profile_cache
 
 # Configurações de teste
 JWT_SECRET = os.getenv("JWT_SECRET", "test-secret")
@@ -38,6 +39,7 @@ class TestA01AccessControl:
     
     def setup_method(self):
         """Configuração executada antes de cada teste"""
+        profile_cache.clear()
         self.vulnerable_client = TestClient(vulnerable_app)
         self.secure_client = TestClient(create_secure_app())
         
@@ -114,6 +116,19 @@ class TestA01AccessControl:
         assert response.status_code == 404
         assert "User not found" in response.json()["detail"]
 
+    @patch('auth.db.execute_query')
+    def test_profile_served_from_cache(self, mock_db):
+        print("\n > Testa se o perfil é servido do cache na segunda requisição | Esperado: 1 consulta ao banco")
+        mock_db.side_effect = lambda query, params: mock_db_query(params[0])
+        for _ in range(2):
+            response = self.secure_client.get(
+                "/profile?username=alice",
+                headers=self.alice_headers
+            )
+            assert response.status_code == 200
+            assert response.json()["username"] == "alice"
+        assert mock_db.call_count == 1
+
     def test_invalid_token_rejected(self):
         print("\n > Testa se tokens inválidos são rejeitados (vulnerável e seguro) | Esperado: 401 Unauthorized")
         invalid_headers = {"Authorization": "Bearer invalid-token"}
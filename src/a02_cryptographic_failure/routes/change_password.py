@@ -5,7 +5,7 @@ from pydantic import BaseModel
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'shared')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'utils')))
 
-from auth import get_current_user, db
+from auth import get_current_user, async_db, invalidate_profile, refresh_store
 from crypto import hash_md5
 
 router = APIRouter()
@@ -18,14 +18,11 @@ async def change_password(request: ChangePasswordRequest, current_user: dict = D
     # VULNERÁVEL: Armazena senha com hash MD5
     password_hash = hash_md5(request.new_password)
     query = "UPDATE users SET password = %s WHERE username = %s"
-    conn = db.get_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(query, (password_hash, current_user["username"]))
-            conn.commit()
-            if cursor.rowcount > 0:
-                return {"message": "Senha alterada com sucesso (MD5)"}
-            else:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuário não encontrado")
-    finally:
-        conn.close()
+    rowcount = await async_db.execute_update(query, (password_hash, current_user["username"]))
+    invalidate_profile(current_user["username"])
+    if rowcount > 0:
+        # Sessões abertas com a senha antiga precisam fazer login de novo
+        await async_db.run(refresh_store.revoke_user, current_user["username"])
+        return {"message": "Senha alterada com sucesso (MD5)"}
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuário não encontrado")
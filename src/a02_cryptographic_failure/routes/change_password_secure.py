@@ -1,12 +1,14 @@
 import sys
 import os
+from concurrent.futures.process import BrokenProcessPool
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'shared')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'utils')))
 
-from crypto import hash_bcrypt
-from auth import get_current_user, db
+from crypto import hash_bcrypt_async
+from hash_service import HashQueueFull, HashTimeout
+from auth import get_current_user, async_db, invalidate_profile, refresh_store
 
 router = APIRouter()
 
@@ -15,17 +17,21 @@ class ChangePasswordRequest(BaseModel):
 
 @router.post("/change-password-secure")
 async def change_password_secure(request: ChangePasswordRequest, current_user: dict = Depends(get_current_user)):
-    # SEGURO: Armazena senha com bcrypt
-    password_hash = hash_bcrypt(request.new_password)
-    query = "UPDATE users SET password = %s WHERE username = %s"
-    conn = db.get_connection()
+    # SEGURO: Armazena senha com bcrypt (calculado em outro processo)
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(query, (password_hash, current_user["username"]))
-            conn.commit()
-            if cursor.rowcount > 0:
-                return {"message": "Senha alterada com sucesso (bcrypt)"}
-            else:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuário não encontrado")
-    finally:
-        conn.close()
+        password_hash = await hash_bcrypt_async(request.new_password)
+    except (HashQueueFull, HashTimeout, BrokenProcessPool):
+        # BrokenProcessPool: o serviço já descartou o pool; a próxima chamada cria outro
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço de hashing sobrecarregado, tente novamente"
+        )
+    query = "UPDATE users SET password = %s WHERE username = %s"
+    rowcount = await async_db.execute_update(query, (password_hash, current_user["username"]))
+    invalidate_profile(current_user["username"])
+    if rowcount > 0:
+        # Sessões abertas com a senha antiga precisam fazer login de novo
+        await async_db.run(refresh_store.revoke_user, current_user["username"])
+        return {"message": "Senha alterada com sucesso (bcrypt)"}
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuário não encontrado")
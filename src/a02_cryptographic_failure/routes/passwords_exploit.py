@@ -1,34 +1,92 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import List
 import sys
 import os
 from fastapi import APIRouter, HTTPException, status, Depends
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'shared')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'utils')))
 
-from auth import db
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+
+from auth import async_db, db, get_current_user
+from streaming import json_object_chunks, ndjson_lines
+from rate_limit import enforce
 from utils.crypto import hash_md5
 
 router = APIRouter()
+# /audit-passwords fica em um router separado, montado só no app vulnerável
+audit_router = APIRouter()
+
+# Limite de candidatas por chamada de /audit-passwords
+AUDIT_MAX_CANDIDATES = int(os.getenv("AUDIT_MAX_CANDIDATES", "100000"))
+# Usuários autorizados a auditar (a auditoria revela quem usa cada senha)
+AUDIT_ADMINS = {name.strip() for name in os.getenv("AUDIT_ADMINS", "admin").split(",") if name.strip()}
 
 class ExploitRequest(BaseModel):
     password: str
 
 
 @router.post("/exploit-passwords")
-async def exploit_passwords(request: ExploitRequest):
+async def exploit_passwords(request: ExploitRequest, http_request: Request):
+    # Limite por IP antes do hash e da consulta (429 + Retry-After)
+    enforce(http_request, "exploit-passwords")
     # VULNERÁVEL: Busca usuários pelo hash MD5 da senha
     password_hash = hash_md5(request.password)
     query = "SELECT username FROM users WHERE password = %s"
-    users = db.execute_query(query, (password_hash,))
+    users = await async_db.execute_query(query, (password_hash,))
     if users:
         return {"users": [u["username"] for u in users]}
     else:
         raise HTTPException(status_code=404, detail="Nenhum usuário encontrado com essa senha")
 
+class AuditRequest(BaseModel):
+    passwords: List[str]
+
+
+def audit_passwords(candidates):
+    """
+    Resolve todas as candidatas com uma única consulta `password = ANY(%s)`
+
+    Os hashes são calculados em lote e a busca usa o índice idx_users_password.
+    Só encontra hashes MD5 (sem salt): bcrypt exigiria testar usuário a usuário.
+    """
+    by_hash = {hash_md5(candidate): candidate for candidate in set(candidates)}
+    query = "SELECT username, password FROM users WHERE password = ANY(%s)"
+    matches = {}
+    for row in db.execute_query(query, (list(by_hash),)):
+        matches.setdefault(by_hash[row["password"]], []).append(row["username"])
+    return matches
+
+
+def require_audit_admin(current_user: dict = Depends(get_current_user)):
+    if current_user["username"] not in AUDIT_ADMINS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito a administradores")
+    return current_user
+
+
+@audit_router.post("/audit-passwords")
+async def audit_weak_passwords(
+    request: AuditRequest, http_request: Request, current_user: dict = Depends(require_audit_admin)
+):
+    # Auditoria em lote de senhas fracas/vazadas (ex: uma lista de breach)
+    enforce(http_request, "audit-passwords", current_user["username"])
+    if len(request.passwords) > AUDIT_MAX_CANDIDATES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {AUDIT_MAX_CANDIDATES} senhas por chamada"
+        )
+    matches = await async_db.run(audit_passwords, request.passwords)
+    return {"checked": len(set(request.passwords)), "matches": matches}
+
 # Endpoint GET para consultar todos os usuários e senhas
+# Resposta em streaming (cursor server-side): a memória não cresce com a tabela
 @router.get("/all-data")
-async def get_all_data():
+async def get_all_data(format: str = Query("json", pattern="^(json|ndjson)$")):
     query = "SELECT username, password FROM users"
-    users = db.execute_query(query)
-    return {"users": users}
+    # Gerador síncrono: o StreamingResponse o consome em uma thread
+    rows = db.stream_query(query)
+    if format == "ndjson":
+        return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
+    return StreamingResponse(json_object_chunks("users", rows), media_type="application/json")
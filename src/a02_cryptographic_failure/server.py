@@ -7,12 +7,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 's
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from routes.change_password import router as change_password_router
-from routes.passwords_exploit import router as passwords_exploit_router
+from routes.passwords_exploit import audit_router, router as passwords_exploit_router
 from auth import build_server
 
 app = build_server()
 app.include_router(change_password_router)
 app.include_router(passwords_exploit_router)
+app.include_router(audit_router)
 
 # Rota para servir index.html como página principal
 @app.get("/", response_class=HTMLResponse)
@@ -24,7 +25,7 @@ async def serve_index():
 async def root():
     return {
         "mensagem": "A02 - Falha Criptográfica (Vulnerável)",
-        "endpoints": ["/change-password", "/exploit-passwords"]
+        "endpoints": ["/change-password", "/exploit-passwords", "/audit-passwords", "/all-data"]
     }
 
 if __name__ == "__main__":
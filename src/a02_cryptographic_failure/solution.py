@@ -8,11 +8,16 @@ from routes.change_password_secure import router as change_password_router
 from routes.passwords_exploit import router as passwords_exploit_router
 
 from auth import build_server
+from crypto import hashing_service
 
 app = build_server()
 app.include_router(change_password_router)
 app.include_router(passwords_exploit_router)
 
+@app.on_event("shutdown")
+async def shutdown_hashing_service():
+    hashing_service.shutdown()
+
 @app.get("/")
 async def root():
     return {
@@ -8,7 +8,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
 sys.path.append(os.path.dirname(__file__))
 
-from auth import db
+import jwt
+
+from auth import db, JWT_SECRET, JWT_ALGORITHM
 from crypto import hash_md5, hash_bcrypt, verify_bcrypt
 from server import app as vulnerable_app
 from solution import app as secure_app
@@ -104,4 +106,41 @@ class TestCryptographicFailure:
         assert response.status_code == 200
         users = response.json().get("users", [])      
         for user in users:
-            assert verify_bcrypt("alice123", user["password"])
\ No newline at end of file
+            assert verify_bcrypt("alice123", user["password"])
+
+    def test_audit_passwords_in_bulk(self):
+        client = TestClient(vulnerable_app)
+        token = jwt.encode({"sub": "admin"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        candidates = ["alice123", "bob123", "123456", "alice123"]
+        response = client.post(
+            "/audit-passwords",
+            json={"passwords": candidates},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["checked"] == 3
+        assert data["matches"] == {"alice123": ["alice"], "bob123": ["bob"]}
+
+        # Sem token não há auditoria
+        response = client.post("/audit-passwords", json={"passwords": candidates})
+        assert response.status_code == 403
+
+        # Usuário comum também não
+        token = jwt.encode({"sub": "alice"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        response = client.post(
+            "/audit-passwords",
+            json={"passwords": candidates},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 403
+
+    def test_secure_audit_passwords_not_available(self):
+        client = TestClient(secure_app)
+        token = jwt.encode({"sub": "admin"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        response = client.post(
+            "/audit-passwords",
+            json={"passwords": ["alice123"]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 404
@@ -1,13 +1,25 @@
-import hashlib
-from passlib.hash import bcrypt
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared')))
+
+from hash_service import HashingService
+from hashers import get_hasher, hash_password
+
+# Pool de processos para o hashing pesado (bcrypt) não bloquear o event loop
+hashing_service = HashingService()
 
 # VULNERÁVEL: Hash MD5 (não recomendado)
 def hash_md5(password: str) -> str:
-    return hashlib.md5(password.encode()).hexdigest()
+    return hash_password(password, "md5")
 
-# SEGURO: Hash bcrypt
+# SEGURO: Hash bcrypt (rounds definidos por BCRYPT_ROUNDS)
 def hash_bcrypt(password: str) -> str:
-    return bcrypt.hash(password)
+    return hash_password(password, "bcrypt")
 
 def verify_bcrypt(password: str, hashed: str) -> bool:
-    return bcrypt.verify(password, hashed)
+    return get_hasher("bcrypt").verify(password, hashed)
+
+# Versão assíncrona: executa o bcrypt em outro processo
+async def hash_bcrypt_async(password: str) -> str:
+    return await hashing_service.run(hash_bcrypt, password, scheme="bcrypt", operation="hash")
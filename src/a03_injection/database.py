@@ -0,0 +1,335 @@
+"""
+A03 - SQLite connection management
+
+Keeps one long-lived connection per thread instead of opening and closing a
+new one in every handler. Connections are tuned for a read-heavy workload:
+- WAL journal mode, so readers never block on the writer
+- synchronous=NORMAL, a larger page cache and memory-mapped I/O
+- sqlite3's prepared-statement cache (cached_statements)
+- sqlite3.Row rows, so handlers read columns by name
+
+It also owns the product search index: an FTS5 table kept in sync with
+`products` by triggers, plus b-tree indexes on category and price.
+
+Startup does not rebuild the schema and seed rows: they are built once into a
+template snapshot (cached on disk next to this module, or in A03_TEMPLATE_DIR,
+and in an in-memory connection) and copied into the app database with the
+backup API.
+With A03_DB_MEMORY=1 the app databases live in shared-cache memory instead.
+"""
+
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+
+from metrics import observe_query
+from slow_query import log_if_slow, sqlite_explainer
+
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+A03_DB_MEMORY = os.getenv("A03_DB_MEMORY", "").lower() in ("1", "true", "yes")
+# Synthetic products added to the template on top of the sample ones
+A03_TEMPLATE_EXTRA_PRODUCTS = int(os.getenv("A03_TEMPLATE_EXTRA_PRODUCTS", "0"))
+TEMPLATE_DIR = os.getenv("A03_TEMPLATE_DIR", os.path.abspath(os.path.dirname(__file__)))
+
+
+def database_path(filename):
+    """Returns the app database location: `filename`, or a shared-cache memory URI"""
+    if A03_DB_MEMORY:
+        return f"file:{os.path.splitext(filename)[0]}?mode=memory&cache=shared"
+    return filename
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Records each statement's execution time in the metrics, by fingerprint
+
+    Statements slower than SLOW_QUERY_MS also go to the slow-query log; the
+    first slow one of each fingerprint carries its EXPLAIN QUERY PLAN.
+    """
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            observe_query("sqlite", sql, elapsed)
+            log_if_slow("sqlite", sql, parameters, elapsed, self.rowcount if self.rowcount >= 0 else None,
+                        explainer=sqlite_explainer, source=self.connection)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            observe_query("sqlite", sql, elapsed)
+            log_if_slow("sqlite", sql, None, elapsed, self.rowcount if self.rowcount >= 0 else None)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (and execute shortcuts) are InstrumentedCursor"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionManager:
+    """Hands out one tuned connection per thread and closes them all on shutdown"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.uri = db_path.startswith("file:")
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Keeps a shared-cache memory database alive between requests
+        self._anchor = None
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            cached_statements=SQLITE_STATEMENT_CACHE,
+            check_same_thread=False,
+            uri=self.uri,
+            factory=InstrumentedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def connection(self):
+        """Returns the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def restore_template(self):
+        """Replaces the database with a copy of the template (schema + seed data)"""
+        self.close_all()
+        if self.uri:
+            self._anchor = sqlite3.connect(self.db_path, uri=True, check_same_thread=False)
+            target = self._anchor
+        else:
+            remove_database(self.db_path)
+            target = sqlite3.connect(self.db_path)
+        template = template_connection()
+        try:
+            template.backup(target)
+        finally:
+            template.close()
+            if target is not self._anchor:
+                target.close()
+
+    def close_all(self):
+        """Closes every connection handed out (the last close checkpoints the WAL)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            if self._anchor is not None:
+                connections.append(self._anchor)
+                self._anchor = None
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+def remove_database(db_path):
+    """Deletes the database file along with its WAL/shared-memory files"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY,
+    username TEXT UNIQUE,
+    password TEXT,
+    email TEXT,
+    role TEXT
+);
+
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    category TEXT,
+    price REAL,
+    description TEXT
+);
+"""
+
+SEED_USERS = [
+    (1, 'admin', 'admin123', 'admin@company.com', 'admin'),
+    (2, 'alice', 'alice123', 'alice@company.com', 'user'),
+    (3, 'bob', 'bob456', 'bob@company.com', 'user'),
+    (4, 'charlie', 'charlie789', 'charlie@company.com', 'user')
+]
+
+SEED_PRODUCTS = [
+    (1, 'Laptop', 'electronics', 999.99, 'High-performance laptop'),
+    (2, 'Phone', 'electronics', 599.99, 'Smartphone with great camera'),
+    (3, 'Book', 'books', 29.99, 'Programming guide'),
+    (4, 'Headphones', 'electronics', 199.99, 'Noise-canceling headphones'),
+    (5, 'Tablet', 'electronics', 399.99, 'Portable tablet device')
+]
+
+PRODUCT_SEARCH_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_products_category_price ON products (category, price, id);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name, content='products', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, name) VALUES (new.id, new.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO products_fts (rowid, name) VALUES (new.id, new.name);
+END;
+"""
+
+
+def create_search_index(conn):
+    """Creates the FTS5 index and triggers, indexing any existing products"""
+    conn.executescript(
+        PRODUCT_SEARCH_SCHEMA
+        + "INSERT INTO products_fts (products_fts) VALUES ('rebuild');"
+    )
+
+
+def fts_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word must match as a prefix
+
+    Words are quoted, so FTS5 operators in the input are treated as text.
+    Returns None when the input has no searchable words.
+    """
+    tokens = re.findall(r"\w+", text)
+    if not tokens:
+        return None
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+
+def _extra_products(count, start_id):
+    """Deterministic synthetic catalog rows, so the template can grow to realistic size"""
+    rng = random.Random(start_id)
+    categories = ["catalog", "garden", "kitchen", "sports", "toys"]
+    for product_id in range(start_id, start_id + count):
+        category = rng.choice(categories)
+        yield (
+            product_id,
+            f"Item {product_id}",
+            category,
+            round(rng.uniform(1, 2000), 2),
+            f"Synthetic {category} item",
+        )
+
+
+def build_template(conn, extra_products=A03_TEMPLATE_EXTRA_PRODUCTS):
+    """Creates the schema, seed rows and search index in `conn`"""
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO users (id, username, password, email, role) VALUES (?, ?, ?, ?, ?)",
+        SEED_USERS
+    )
+    conn.executemany(
+        "INSERT INTO products (id, name, category, price, description) VALUES (?, ?, ?, ?, ?)",
+        SEED_PRODUCTS
+    )
+    conn.executemany(
+        "INSERT INTO products (id, name, category, price, description) VALUES (?, ?, ?, ?, ?)",
+        _extra_products(extra_products, len(SEED_PRODUCTS) + 1)
+    )
+    conn.commit()
+    # Full-text index on product names + b-tree indexes on category/price
+    create_search_index(conn)
+    conn.execute("VACUUM")
+
+
+def _template_file():
+    # The name carries a digest of the schema and seed data: edits invalidate it
+    content = repr((SCHEMA, SEED_USERS, SEED_PRODUCTS, PRODUCT_SEARCH_SCHEMA, A03_TEMPLATE_EXTRA_PRODUCTS))
+    version = hashlib.sha256(content.encode()).hexdigest()[:12]
+    return os.path.join(TEMPLATE_DIR, f"a03_template-{version}.db")
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def _template_master():
+    """
+    Returns the in-memory master copy of the template, building it at most once
+
+    Loaded from the snapshot file when present; otherwise built in memory
+    and written to the snapshot (atomically, several servers may race).
+    Copies go through the backup API, which unlike serialize()/deserialize()
+    is available on every supported Python version.
+    """
+    global _template
+    if _template is None:
+        master = sqlite3.connect(":memory:", check_same_thread=False)
+        path = _template_file()
+        if os.path.exists(path):
+            snapshot = sqlite3.connect(path)
+            try:
+                snapshot.backup(master)
+            finally:
+                snapshot.close()
+        else:
+            build_template(master)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                snapshot = sqlite3.connect(tmp_path)
+                try:
+                    master.backup(snapshot)
+                finally:
+                    snapshot.close()
+                os.replace(tmp_path, path)
+            except (OSError, sqlite3.Error):
+                # Read-only tree: the in-process copy is enough
+                remove_database(tmp_path)
+        _template = master
+    return _template
+
+
+def template_connection():
+    """Returns a fresh in-memory connection holding the template"""
+    conn = sqlite3.connect(":memory:")
+    with _template_lock:
+        _template_master().backup(conn)
+    return conn
@@ -0,0 +1,73 @@
+"""
+A03 - Keyset pagination cursors
+
+Pages are addressed by the sort key of the last row returned (`id`, or
+`(price, id)` when sorting by price) instead of an OFFSET, so every page is
+an index seek and costs the same no matter how deep the client goes.
+
+Cursors are opaque to clients: base64url(JSON) plus an HMAC-SHA256 tag, so a
+tampered or forged cursor is rejected instead of being trusted.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+# Without a configured secret, cursors are only valid for this process
+CURSOR_SECRET = (os.getenv("CURSOR_SECRET") or secrets.token_hex(32)).encode()
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed, was tampered with or belongs to another sort"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(body):
+    return hmac.new(CURSOR_SECRET, body.encode(), hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(sort, key):
+    """Builds a cursor pointing after the row whose sort key is `key`"""
+    payload = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"))
+    body = _b64encode(payload.encode())
+    return f"{body}.{_b64encode(_sign(body))}"
+
+
+def decode_cursor(cursor, sort, size):
+    """Returns the `size`-column sort key stored in `cursor`, validating its signature"""
+    try:
+        body, tag = cursor.split(".")
+        if not hmac.compare_digest(_b64decode(tag), _sign(body)):
+            raise InvalidCursor("Invalid cursor signature")
+        payload = json.loads(_b64decode(body))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(payload, dict) or payload.get("s") != sort:
+        raise InvalidCursor("Cursor does not match the requested sort")
+    key = payload.get("k")
+    if not isinstance(key, list) or len(key) != size:
+        raise InvalidCursor("Malformed cursor key")
+    return key
+
+
+def paginate(rows, limit, sort, key_of):
+    """
+    Splits `limit + 1` fetched rows into the page and its next cursor
+
+    Fetching one extra row tells whether another page exists without a COUNT.
+    """
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(sort, key_of(page[-1]))
+    return page, next_cursor
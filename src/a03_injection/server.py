@@ -7,14 +7,25 @@ from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
 import sqlite3
 import os
+import sys
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
 import uvicorn
 
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from database import ConnectionManager, database_path
+from fast_json import rows_to_dicts, trusted_response
+from metrics import install_metrics
+from rate_limit import enforce
+
 app = FastAPI(title="A03 - Injection (Vulnerable)", version="1.0.0")
 
+install_metrics(app)
+
 # Database setup
-DB_PATH = "vulnerable_app.db"
+DB_PATH = database_path("vulnerable_app.db")
+db = ConnectionManager(DB_PATH)
 
 class UserLogin(BaseModel):
     username: str
@@ -25,68 +36,25 @@ class ProductSearch(BaseModel):
     name: Optional[str] = None
 
 def init_db():
-    """Initialize database with sample data"""
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE,
-            password TEXT,
-            email TEXT,
-            role TEXT
-        )
-    """)
-    
-    # Create products table
-    cursor.execute("""
-        CREATE TABLE products (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            category TEXT,
-            price REAL,
-            description TEXT
-        )
-    """)
-    
-    # Insert sample users
-    users = [
-        (1, 'admin', 'admin123', 'admin@company.com', 'admin'),
-        (2, 'alice', 'alice123', 'alice@company.com', 'user'),
-        (3, 'bob', 'bob456', 'bob@company.com', 'user'),
-        (4, 'charlie', 'charlie789', 'charlie@company.com', 'user')
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO users (id, username, password, email, role) VALUES (?, ?, ?, ?, ?)",
-        users
-    )
-    
-    # Insert sample products
-    products = [
-        (1, 'Laptop', 'electronics', 999.99, 'High-performance laptop'),
-        (2, 'Phone', 'electronics', 599.99, 'Smartphone with great camera'),
-        (3, 'Book', 'books', 29.99, 'Programming guide'),
-        (4, 'Headphones', 'electronics', 199.99, 'Noise-canceling headphones'),
-        (5, 'Tablet', 'electronics', 399.99, 'Portable tablet device')
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO products (id, name, category, price, description) VALUES (?, ?, ?, ?, ?)",
-        products
-    )
-    
-    conn.commit()
-    conn.close()
+    """Initialize database with sample data (restored from the prebuilt template)"""
+    db.restore_template()
+
+def preload():
+    """Runs once in the multi-worker launcher parent, before forking workers"""
+    if not db.uri:
+        # Workers share the database file: restore it once instead of per worker
+        init_db()
+        db.close_all()
+        os.environ["A03_DB_RESTORED"] = "1"
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    if os.getenv("A03_DB_RESTORED") != "1":
+        init_db()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    db.close_all()
 
 @app.get("/", response_class=HTMLResponse)
 async def serve_index():
@@ -101,13 +69,14 @@ async def root():
     }
 
 @app.post("/login")
-async def login(user_data: UserLogin):
+def login(user_data: UserLogin, request: Request):
     """
     🚨 VULNERABLE: SQL Injection in login
     Attacker can bypass authentication with: ' OR '1'='1' --
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    # Throttled per client IP and username before touching the database
+    enforce(request, "a03-login", user_data.username)
+    cursor = db.connection().cursor()
     
     # 🚨 VULNERABLE: Direct string concatenation
     query = f"SELECT * FROM users WHERE username = '{user_data.username}' AND password = '{user_data.password}'"
@@ -115,17 +84,16 @@ async def login(user_data: UserLogin):
     try:
         cursor.execute(query)
         user = cursor.fetchone()
-        conn.close()
         
         if user:
             return {
                 "success": True,
                 "message": "Login successful",
                 "user": {
-                    "id": user[0],
-                    "username": user[1],
-                    "email": user[3],
-                    "role": user[4]
+                    "id": user["id"],
+                    "username": user["username"],
+                    "email": user["email"],
+                    "role": user["role"]
                 },
                 "query_executed": query  # For educational purposes
             }
@@ -133,17 +101,15 @@ async def login(user_data: UserLogin):
             raise HTTPException(status_code=401, detail="Invalid credentials")
     
     except Exception as e:
-        conn.close()
         return {"error": str(e), "query_executed": query}
 
 @app.get("/search")
-async def search_products(category: str = None, name: str = None):
+def search_products(category: str = None, name: str = None):
     """
     🚨 VULNERABLE: SQL Injection in search
     Attacker can extract data with: electronics' UNION SELECT username, password, email, role, 'injected' FROM users --
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = db.connection().cursor()
     
     # Build base query
     query = "SELECT * FROM products WHERE 1=1"
@@ -157,68 +123,43 @@ async def search_products(category: str = None, name: str = None):
     
     try:
         cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
-        
-        products = []
-        for row in results:
-            products.append({
-                "id": row[0],
-                "name": row[1],
-                "category": row[2],
-                "price": row[3],
-                "description": row[4]
-            })
+        products = rows_to_dicts(cursor)
         
-        return {
+        return trusted_response({
             "products": products,
             "query_executed": query  # For educational purposes
-        }
+        })
     
     except Exception as e:
-        conn.close()
         return {"error": str(e), "query_executed": query}
 
 @app.get("/users")
-async def get_users(limit: int = 10):
+def get_users(limit: int = 10):
     """
     🚨 VULNERABLE: SQL Injection in limit parameter
     Attacker can dump all data with: 1; INSERT INTO users (username, password) VALUES ('hacker', 'hacked'); --
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = db.connection().cursor()
     
     # 🚨 VULNERABLE: Direct string formatting
     query = f"SELECT id, username, email, role FROM users LIMIT {limit}"
     
     try:
         cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
-        
-        users = []
-        for row in results:
-            users.append({
-                "id": row[0],
-                "username": row[1],
-                "email": row[2],
-                "role": row[3]
-            })
+        users = rows_to_dicts(cursor)
         
-        return {
+        return trusted_response({
             "users": users,
             "query_executed": query  # For educational purposes
-        }
+        })
     
     except Exception as e:
-        conn.close()
         return {"error": str(e), "query_executed": query}
 
 @app.get("/debug/db-schema")
-async def get_db_schema():
+def get_db_schema():
     """Debug endpoint to show database schema"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = db.connection().cursor()
     
     # Get table names
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -226,13 +167,12 @@ async def get_db_schema():
     
     schema = {}
     for table in tables:
-        table_name = table[0]
+        table_name = table["name"]
         cursor.execute(f"PRAGMA table_info({table_name})")
         columns = cursor.fetchall()
-        schema[table_name] = [{"name": col[1], "type": col[2]} for col in columns]
+        schema[table_name] = [{"name": col["name"], "type": col["type"]} for col in columns]
     
-    conn.close()
     return {"schema": schema}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8005)
\ No newline at end of file
@@ -3,17 +3,29 @@ A03 - Injection (Secure Implementation)
 Demonstrates how to prevent SQL Injection vulnerabilities
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 import sqlite3
 import os
+import sys
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
 import uvicorn
 
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from database import ConnectionManager, database_path, fts_query
+from fast_json import rows_to_dicts, trusted_response
+from metrics import install_metrics
+from rate_limit import enforce
+from pagination import InvalidCursor, decode_cursor, paginate
+
 app = FastAPI(title="A03 - Injection (Secure)", version="1.0.0")
 
+install_metrics(app)
+
 # Database setup
-DB_PATH = "secure_app.db"
+DB_PATH = database_path("secure_app.db")
+db = ConnectionManager(DB_PATH)
 
 class UserLogin(BaseModel):
     username: str
@@ -24,80 +36,38 @@ class ProductSearch(BaseModel):
     name: Optional[str] = None
 
 def init_db():
-    """Initialize database with sample data"""
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE,
-            password TEXT,
-            email TEXT,
-            role TEXT
-        )
-    """)
-    
-    # Create products table
-    cursor.execute("""
-        CREATE TABLE products (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            category TEXT,
-            price REAL,
-            description TEXT
-        )
-    """)
-    
-    # Insert sample users (using parameterized queries)
-    users = [
-        (1, 'admin', 'admin123', 'admin@company.com', 'admin'),
-        (2, 'alice', 'alice123', 'alice@company.com', 'user'),
-        (3, 'bob', 'bob456', 'bob@company.com', 'user'),
-        (4, 'charlie', 'charlie789', 'charlie@company.com', 'user')
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO users (id, username, password, email, role) VALUES (?, ?, ?, ?, ?)",
-        users
-    )
-    
-    # Insert sample products
-    products = [
-        (1, 'Laptop', 'electronics', 999.99, 'High-performance laptop'),
-        (2, 'Phone', 'electronics', 599.99, 'Smartphone with great camera'),
-        (3, 'Book', 'books', 29.99, 'Programming guide'),
-        (4, 'Headphones', 'electronics', 199.99, 'Noise-canceling headphones'),
-        (5, 'Tablet', 'electronics', 399.99, 'Portable tablet device')
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO products (id, name, category, price, description) VALUES (?, ?, ?, ?, ?)",
-        products
-    )
-    
-    conn.commit()
-    conn.close()
+    """Initialize database with sample data (restored from the prebuilt template)"""
+    db.restore_template()
+
+def preload():
+    """Runs once in the multi-worker launcher parent, before forking workers"""
+    if not db.uri:
+        # Workers share the database file: restore it once instead of per worker
+        init_db()
+        db.close_all()
+        os.environ["A03_DB_RESTORED"] = "1"
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    if os.getenv("A03_DB_RESTORED") != "1":
+        init_db()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    db.close_all()
 
 @app.get("/")
 async def root():
     return {"message": "A03 - Injection (Secure Implementation)"}
 
 @app.post("/login")
-async def login(user_data: UserLogin):
+def login(user_data: UserLogin, request: Request):
     """
     ✅ SECURE: Uses parameterized queries to prevent SQL Injection
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    # ✅ SECURE: Throttled per client IP and username (429 + Retry-After) before any DB work
+    enforce(request, "a03-secure-login", user_data.username)
+    cursor = db.connection().cursor()
     
     # ✅ SECURE: Using parameterized query
     query = "SELECT * FROM users WHERE username = ? AND password = ?"
@@ -105,36 +75,61 @@ async def login(user_data: UserLogin):
     try:
         cursor.execute(query, (user_data.username, user_data.password))
         user = cursor.fetchone()
-        conn.close()
-        
-        if user:
-            return {
-                "success": True,
-                "message": "Login successful",
-                "user": {
-                    "id": user[0],
-                    "username": user[1],
-                    "email": user[3],
-                    "role": user[4]
-                }
-            }
-        else:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    except Exception as e:
-        conn.close()
+    except sqlite3.Error:
         raise HTTPException(status_code=500, detail="Database error")
+    
+    if user:
+        return {
+            "success": True,
+            "message": "Login successful",
+            "user": {
+                "id": user["id"],
+                "username": user["username"],
+                "email": user["email"],
+                "role": user["role"]
+            }
+        }
+    else:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+# Keyset sort orders accepted by /search: (column, result field) pairs of the sort key
+SEARCH_SORTS = {
+    "id": (("p.id", "id"),),
+    "price": (("p.price", "price"), ("p.id", "id")),
+    "relevance": (("products_fts.rank", "score"), ("p.id", "id")),
+}
 
 @app.get("/search")
-async def search_products(category: str = None, name: str = None):
+def search_products(
+    category: str = None,
+    name: str = None,
+    sort: str = Query(None, description="id, price ou relevance (padrão com name)"),
+    limit: int = 50,
+    cursor: str = None
+):
     """
     ✅ SECURE: Uses parameterized queries and input validation
+
+    Name search goes through the FTS5 index (token/prefix match, ranked by
+    bm25) instead of a `LIKE '%name%'` full table scan. Results are paged
+    with keyset cursors: pass `next_cursor` back as `cursor`.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    # Same validation (and 400) as /users, sort and cursor
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="Invalid limit parameter")
+    
+    sort = sort or ("relevance" if name else "id")
+    if sort not in SEARCH_SORTS or (sort == "relevance" and not name):
+        raise HTTPException(status_code=400, detail="Invalid sort parameter")
+    key_columns = [column for column, _ in SEARCH_SORTS[sort]]
+    key_fields = [field for _, field in SEARCH_SORTS[sort]]
+    
+    db_cursor = db.connection().cursor()
     
-    # Start with base query
-    query = "SELECT * FROM products WHERE 1=1"
+    # Query fragments are fixed strings; user input only goes in `params`
+    source = "products p"
+    score = "0"
+    conditions = []
     params = []
     
     # ✅ SECURE: Using parameterized queries
@@ -142,71 +137,80 @@ async def search_products(category: str = None, name: str = None):
         # Input validation
         if len(category) > 50:
             raise HTTPException(status_code=400, detail="Category name too long")
-        query += " AND category = ?"
+        conditions.append("p.category = ?")
         params.append(category)
     
     if name:
         # Input validation
         if len(name) > 100:
             raise HTTPException(status_code=400, detail="Product name too long")
-        query += " AND name LIKE ?"
-        params.append(f"%{name}%")
+        match = fts_query(name)
+        if match is None:
+            return {"products": [], "next_cursor": None}
+        source = "products_fts JOIN products p ON p.id = products_fts.rowid"
+        score = "products_fts.rank"
+        conditions.append("products_fts MATCH ?")
+        params.append(match)
+    
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort, len(key_columns))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        placeholders = ", ".join("?" for _ in key_columns)
+        conditions.append(f"({', '.join(key_columns)}) > ({placeholders})")
+        params.extend(after)
+    
+    order_by = ", ".join(key_columns)
+    query = (
+        f"SELECT p.id, p.name, p.category, p.price, p.description, {score} AS score FROM {source}"
+        f" WHERE {' AND '.join(conditions) or '1=1'} ORDER BY {order_by} LIMIT ?"
+    )
+    params.append(limit + 1)
     
     try:
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-        
-        products = []
-        for row in results:
-            products.append({
-                "id": row[0],
-                "name": row[1],
-                "category": row[2],
-                "price": row[3],
-                "description": row[4]
-            })
-        
-        return {"products": products}
-    
-    except Exception as e:
-        conn.close()
+        db_cursor.execute(query, params)
+        rows = rows_to_dicts(db_cursor)
+    except sqlite3.Error:
         raise HTTPException(status_code=500, detail="Database error")
+    
+    products, next_cursor = paginate(rows, limit, sort, lambda row: [row[k] for k in key_fields])
+    for product in products:
+        del product["score"]
+    
+    return trusted_response({"products": products, "next_cursor": next_cursor})
 
 @app.get("/users")
-async def get_users(limit: int = 10):
+def get_users(limit: int = 10, cursor: str = None):
     """
     ✅ SECURE: Uses parameterized queries and input validation
+
+    Keyset pagination on `id`: pass `next_cursor` back as `cursor`.
     """
     # Input validation
     if not isinstance(limit, int) or limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="Invalid limit parameter")
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    after_id = 0
+    if cursor:
+        try:
+            after_id, = decode_cursor(cursor, "id", 1)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    db_cursor = db.connection().cursor()
     
     # ✅ SECURE: Using parameterized query
-    query = "SELECT id, username, email, role FROM users LIMIT ?"
+    query = "SELECT id, username, email, role FROM users WHERE id > ? ORDER BY id LIMIT ?"
     
     try:
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
-        conn.close()
-        
-        users = []
-        for row in results:
-            users.append({
-                "id": row[0],
-                "username": row[1],
-                "email": row[2],
-                "role": row[3]
-            })
-        
-        return {"users": users}
-    
-    except Exception as e:
-        conn.close()
+        db_cursor.execute(query, (after_id, limit + 1))
+        rows = rows_to_dicts(db_cursor)
+    except sqlite3.Error:
         raise HTTPException(status_code=500, detail="Database error")
+    
+    users, next_cursor = paginate(rows, limit, "id", lambda row: [row["id"]])
+    return trusted_response({"users": users, "next_cursor": next_cursor})
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8006)
\ No newline at end of file
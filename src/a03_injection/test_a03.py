@@ -4,6 +4,8 @@ import time
 import subprocess
 import signal
 import os
+import shutil
+import tempfile
 from multiprocessing import Process
 
 import os
@@ -14,8 +16,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
 
 # URLs dos servidores
-VULNERABLE_URL = "http://localhost:8003"
-SECURE_URL = "http://localhost:8004"
+VULNERABLE_URL = "http://localhost:8005"
+SECURE_URL = "http://localhost:8006"
 
 class TestA03Injection:
     
@@ -24,16 +26,19 @@ class TestA03Injection:
         """Inicia ambos os servidores para teste"""
         cls.vulnerable_process = None
         cls.secure_process = None
+        # Snapshot do template dos bancos fora da árvore de código
+        cls.template_dir = tempfile.mkdtemp(prefix="a03_template_")
+        env = dict(os.environ, A03_TEMPLATE_DIR=cls.template_dir)
         
         # Inicia o servidor vulnerável
         cls.vulnerable_process = subprocess.Popen([
             "python3", "server.py"
-        ], cwd="src/a03_injection")
+        ], cwd="src/a03_injection", env=env)
         
         # Inicia o servidor seguro
         cls.secure_process = subprocess.Popen([
             "python3", "solution.py"
-        ], cwd="src/a03_injection")
+        ], cwd="src/a03_injection", env=env)
         
         # Aguarda os servidores iniciarem
         time.sleep(3)
@@ -53,6 +58,7 @@ class TestA03Injection:
         for db_file in ["vulnerable_app.db", "secure_app.db"]:
             if os.path.exists(db_file):
                 os.remove(db_file)
+        shutil.rmtree(cls.template_dir, ignore_errors=True)
 
     # Testa a vulnerabilidade de injeção de SQL no
     # endpoint de login de um servidor vulnerável.
@@ -175,6 +181,61 @@ class TestA03Injection:
         assert response_secure.status_code == 200
         assert len(response_secure.json()["products"]) > 0
 
+    def test_secure_search_uses_prefix_token_match(self):
+        """Testa a busca por nome via índice full-text (prefixo de palavra)"""
+        response = requests.get(f"{SECURE_URL}/search", params={"name": "lap"})
+        assert response.status_code == 200
+        products = response.json()["products"]
+        assert [p["name"] for p in products] == ["Laptop"]
+        assert set(products[0]) == {"id", "name", "category", "price", "description"}
+        
+        # Operadores FTS5 na entrada são tratados como texto
+        response = requests.get(f"{SECURE_URL}/search", params={"name": "phone OR NEAR(", "category": "electronics"})
+        assert response.status_code == 200
+        assert response.json()["products"] == []
+
+    def test_secure_users_keyset_pagination(self):
+        """Testa a paginação por cursor do endpoint de usuários (servidor seguro)"""
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = requests.get(f"{SECURE_URL}/users", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data["users"]) <= 2
+            seen.extend(user["id"] for user in data["users"])
+            if data["next_cursor"] is None:
+                break
+            params["cursor"] = data["next_cursor"]
+
+        all_users = requests.get(f"{SECURE_URL}/users", params={"limit": 100}).json()["users"]
+        assert seen == [user["id"] for user in all_users]
+
+        # Cursor adulterado é rejeitado
+        response = requests.get(f"{SECURE_URL}/users", params={"limit": 2, "cursor": "eyJzIjoiaWQiLCJrIjpbMF19.AAAA"})
+        assert response.status_code == 400
+
+    def test_secure_search_keyset_pagination_by_price(self):
+        """Testa a paginação por cursor da busca ordenada por preço"""
+        first = requests.get(f"{SECURE_URL}/search", params={"sort": "price", "limit": 1}).json()
+        assert len(first["products"]) == 1
+        second = requests.get(
+            f"{SECURE_URL}/search", params={"sort": "price", "limit": 1, "cursor": first["next_cursor"]}
+        ).json()
+        assert second["products"][0]["price"] >= first["products"][0]["price"]
+        assert second["products"][0]["id"] != first["products"][0]["id"]
+
+        # Cursor de outra ordenação é rejeitado
+        response = requests.get(f"{SECURE_URL}/search", params={"sort": "id", "cursor": first["next_cursor"]})
+        assert response.status_code == 400
+
+    def test_secure_limit_out_of_range_is_400(self):
+        """Testa se /search e /users rejeitam limit fora da faixa da mesma forma"""
+        for path in ("/search", "/users"):
+            for limit in (0, 101):
+                response = requests.get(f"{SECURE_URL}{path}", params={"limit": limit})
+                assert response.status_code == 400
+
     def test_database_schema_endpoint(self):
         """Testa o endpoint de debug do esquema do banco de dados"""
         response = requests.get(f"{VULNERABLE_URL}/debug/db-schema")
@@ -190,5 +251,30 @@ class TestA03Injection:
         assert "password" in user_columns
         assert "email" in user_columns
 
+    def test_template_restore_gives_fresh_copy(self, tmp_path, monkeypatch):
+        """Testa que cada restauração do template parte dos dados de exemplo"""
+        sys.path.append(current_dir)
+        import database
+        from database import ConnectionManager
+        
+        # O snapshot do template vai para um diretório temporário, não para o código
+        monkeypatch.setattr(database, "TEMPLATE_DIR", str(tmp_path))
+        monkeypatch.setattr(database, "_template", None)
+        manager = ConnectionManager("file:test_template?mode=memory&cache=shared")
+        try:
+            manager.restore_template()
+            conn = manager.connection()
+            conn.execute("DELETE FROM users")
+            conn.commit()
+            
+            manager.restore_template()
+            conn = manager.connection()
+            assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 4
+            rows = conn.execute("SELECT rowid FROM products_fts WHERE products_fts MATCH 'laptop'").fetchall()
+            assert [row[0] for row in rows] == [1]
+            assert len(list(tmp_path.glob("a03_template-*.db"))) == 1
+        finally:
+            manager.close_all()
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
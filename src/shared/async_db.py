@@ -0,0 +1,91 @@
+"""
+Acesso assíncrono ao banco de dados para os endpoints `async def`
+
+psycopg2 é bloqueante: chamado direto de um endpoint assíncrono, ele trava o
+event loop para todos os clientes. AsyncDatabase expõe a mesma interface
+(execute_query/execute_update) executando as chamadas em um pool de threads
+limitado, com timeout por chamada.
+
+O timeout só libera o endpoint: a thread do pool continua executando a query
+(psycopg2 não a interrompe) e mantém a conexão emprestada até ela terminar.
+Queries presas em sequência podem esgotar as threads e as conexões; para
+cancelá-las no servidor use o statement_timeout do PostgreSQL.
+install_timeout_handler() converte QueryTimeout em 504 nas aplicações.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from pool import DB_POOL_MAX_SIZE
+
+load_dotenv()
+
+# Mais threads que conexões no pool só gerariam espera por conexão
+DB_ASYNC_WORKERS = int(os.getenv("DB_ASYNC_WORKERS", str(DB_POOL_MAX_SIZE)))
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "10"))
+
+
+class QueryTimeout(Exception):
+    """A query não terminou dentro do tempo limite"""
+
+
+def install_timeout_handler(app):
+    """Responde 504 (em vez de 500) quando uma chamada ao banco passa do timeout"""
+    from fastapi.responses import JSONResponse
+
+    @app.exception_handler(QueryTimeout)
+    async def query_timeout_handler(request, exc):
+        return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+    return app
+
+
+class AsyncDatabase:
+    """
+    Wrapper assíncrono sobre Database/DatabaseConnection
+
+    O método síncrono é resolvido no momento da chamada, então substituir
+    `db.execute_query` (ex: com mock nos testes) continua funcionando.
+    """
+
+    def __init__(self, database, max_workers=DB_ASYNC_WORKERS, timeout=DB_QUERY_TIMEOUT):
+        self.database = database
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Threads não sobrevivem a um fork: cada processo cria o seu executor
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="db"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    async def run(self, func, *args, timeout=None):
+        """Executa uma função bloqueante no pool de threads do banco"""
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), functools.partial(func, *args))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # A thread segue com a query (e a conexão) até o banco responder
+            raise QueryTimeout(f"Query excedeu o limite de {timeout:.1f}s")
+
+    async def execute_query(self, query, params=None, timeout=None):
+        return await self.run(self.database.execute_query, query, params, timeout=timeout)
+
+    async def execute_update(self, query, params=None, timeout=None):
+        return await self.run(self.database.execute_update, query, params, timeout=timeout)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
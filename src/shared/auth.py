@@ -7,6 +7,17 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 import jwt
 from typing import Optional
+import time
+import uuid
+
+from pool import get_pool, close_pools
+from async_db import AsyncDatabase, install_timeout_handler
+from jwt_verifier import get_verifier
+from revocation import get_revocation_store
+from refresh_tokens import RefreshTokenStore
+from profile_cache import get_user_profile, invalidate_profile, profile_cache
+from metrics import install_metrics, observe_query
+from slow_query import log_if_slow, postgres_explainer
 
 load_dotenv()
 
@@ -14,8 +25,11 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# Linhas buscadas por ida ao banco nos cursores server-side
+DB_STREAM_ITERSIZE = int(os.getenv("DB_STREAM_ITERSIZE", "2000"))
 
 security = HTTPBearer()
+token_verifier = get_verifier(JWT_SECRET, JWT_ALGORITHM)
 
 class User(BaseModel):
     id: int
@@ -27,18 +41,67 @@ class DatabaseConnection:
         self.connection_string = DATABASE_URL
     
     def get_connection(self):
-        return psycopg2.connect(self.connection_string)
+        # Conexão emprestada do pool compartilhado: close() a devolve ao pool
+        return get_pool(self.connection_string).checkout()
     
     def execute_query(self, query, params=None):
         conn = self.get_connection()
+        started = time.perf_counter()
+        rows = None
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 cursor.execute(query, params)
-                return cursor.fetchall()
+                rows = cursor.fetchall()
+                return rows
+        finally:
+            conn.close()
+            elapsed = time.perf_counter() - started
+            observe_query("postgres", query, elapsed)
+            log_if_slow("postgres", query, params, elapsed, None if rows is None else len(rows),
+                        explainer=postgres_explainer, source=self, background=True)
+    
+    def execute_update(self, query, params=None):
+        conn = self.get_connection()
+        started = time.perf_counter()
+        rowcount = None
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                conn.commit()
+                rowcount = cursor.rowcount
+                return rowcount
+        finally:
+            conn.close()
+            elapsed = time.perf_counter() - started
+            observe_query("postgres", query, elapsed)
+            log_if_slow("postgres", query, params, elapsed, rowcount,
+                        explainer=postgres_explainer, source=self, background=True)
+    
+    def stream_query(self, query, params=None, itersize=DB_STREAM_ITERSIZE):
+        """
+        Itera as linhas com um cursor nomeado (server-side), sem fetchall()
+
+        O PostgreSQL mantém o resultado e entrega `itersize` linhas por vez,
+        então a memória fica constante qualquer que seja o tamanho da tabela.
+        A conexão fica emprestada até o fim da iteração.
+        """
+        conn = self.get_connection()
+        try:
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = itersize
+                cursor.execute(query, params)
+                yield from cursor
         finally:
+            # Encerra a transação do cursor nomeado ao devolver ao pool
             conn.close()
 
 db = DatabaseConnection()
+# Tokens revogados no servidor de autenticação (/logout) são recusados aqui também
+token_verifier.is_revoked = get_revocation_store(db).is_revoked
+# Sessões de refresh token (revogadas na troca de senha)
+refresh_store = RefreshTokenStore(db)
+# Versão assíncrona para uso nos endpoints async def
+async_db = AsyncDatabase(db)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
@@ -46,7 +109,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     """
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = token_verifier.decode(token)
         username = payload.get("sub")
         if username is None:
             raise HTTPException(
@@ -71,5 +134,17 @@ def build_server():
         description="Workshop demonstrando vulnerabilidades de segurança",
         version="1.0.0"
     )
+
+    @app.on_event("startup")
+    async def warm_public_keys():
+        # ES256/EdDSA: chave de assinatura criada e chaves públicas carregadas antes da primeira requisição
+        token_verifier.warm()
+    
+    @app.on_event("shutdown")
+    async def shutdown_pools():
+        async_db.shutdown()
+        close_pools()
     
+    install_metrics(app)
+    install_timeout_handler(app)
     return app
\ No newline at end of file
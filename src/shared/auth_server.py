@@ -7,17 +7,33 @@ Este módulo fornece funcionalidades para:
 - Criação de usuários de teste
 """
 
-import hashlib
 import jwt
 import os
 from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, status, Depends
+from typing import Optional
+from fastapi import FastAPI, HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import re
+import time
+import uuid
+
+from pool import get_pool, close_pools
+from async_db import AsyncDatabase, install_timeout_handler
+from jwt_verifier import get_verifier
+from jwt_keys import get_signing_keys, is_asymmetric
+from revocation import get_revocation_store
+from refresh_tokens import RefreshTokenError, RefreshTokenStore
+from rate_limit import enforce, stats as rate_limit_stats
+import hashers
+from hashers import verify_password
+from profile_cache import get_user_profile, profile_cache
+from metrics import install_metrics, observe_query
+from slow_query import log_if_slow, postgres_explainer
+from fast_json import trusted_response
 
 load_dotenv()
 
@@ -76,6 +92,7 @@ def check_postgres_user_and_db():
         print(f"Erro ao verificar usuário/banco: {e}")
 
 security = HTTPBearer()
+token_verifier = get_verifier(JWT_SECRET, JWT_ALGORITHM)
 
 class LoginRequest(BaseModel):
     username: str
@@ -85,6 +102,13 @@ class LoginResponse(BaseModel):
     access_token: str
     token_type: str
     username: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 class User(BaseModel):
     id: int
@@ -96,7 +120,7 @@ def hash_password(password: str) -> str:
     Gera hash MD5 da senha (igual ao projeto original)
     NOTA: MD5 é inseguro, usado apenas para compatibilidade com o workshop
     """
-    return hashlib.md5(password.encode()).hexdigest()
+    return hashers.hash_password(password, "md5")
 
 def create_access_token(username: str) -> str:
     """Cria um token JWT para o usuário"""
@@ -104,14 +128,19 @@ def create_access_token(username: str) -> str:
     payload = {
         "sub": username,
         "exp": expire,
-        "iat": datetime.utcnow()
+        "iat": datetime.utcnow(),
+        # Identificador único do token, usado na revogação (/logout)
+        "jti": uuid.uuid4().hex
     }
+    if is_asymmetric(JWT_ALGORITHM):
+        # ES256/EdDSA: assina com a chave privada ativa e informa o kid no header
+        return get_signing_keys(JWT_ALGORITHM).sign(payload)
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def verify_token(token: str) -> dict:
     """Verifica e decodifica um token JWT"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = token_verifier.decode(token)
         username = payload.get("sub")
         if username is None:
             raise HTTPException(
@@ -135,29 +164,51 @@ class Database:
         self.connection_string = DATABASE_URL
     
     def get_connection(self):
-        return psycopg2.connect(self.connection_string)
+        # Conexão emprestada do pool compartilhado: close() a devolve ao pool
+        return get_pool(self.connection_string).checkout()
     
     def execute_query(self, query, params=None):
         conn = self.get_connection()
+        started = time.perf_counter()
+        rows = None
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 cursor.execute(query, params)
-                return cursor.fetchall()
+                rows = cursor.fetchall()
+                return rows
         finally:
             conn.close()
+            elapsed = time.perf_counter() - started
+            observe_query("postgres", query, elapsed)
+            log_if_slow("postgres", query, params, elapsed, None if rows is None else len(rows),
+                        explainer=postgres_explainer, source=self, background=True)
     
     def execute_update(self, query, params=None):
         conn = self.get_connection()
+        started = time.perf_counter()
+        rowcount = None
         try:
             with conn.cursor() as cursor:
                 cursor.execute(query, params)
                 conn.commit()
-                return cursor.rowcount
+                rowcount = cursor.rowcount
+                return rowcount
         finally:
             conn.close()
+            elapsed = time.perf_counter() - started
+            observe_query("postgres", query, elapsed)
+            log_if_slow("postgres", query, params, elapsed, rowcount,
+                        explainer=postgres_explainer, source=self, background=True)
 
 # Instância global do banco
 db = Database()
+# Tokens revogados (logout) são recusados mesmo quando já estão no cache
+revocation_store = get_revocation_store(db)
+token_verifier.is_revoked = revocation_store.is_revoked
+# Renovação da sessão sem senha (/token/refresh)
+refresh_store = RefreshTokenStore(db)
+# Versão assíncrona para uso nos endpoints async def
+async_db = AsyncDatabase(db)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Dependency para extrair usuário do token JWT"""
@@ -169,12 +220,18 @@ def authenticate_user(username: str, password: str) -> dict:
     Autentica usuário verificando username e senha
     Retorna dados do usuário se autenticado, caso contrário None
     """
-    password_hash = hash_password(password)
-    query = "SELECT id, username, age FROM users WHERE username = %s AND password = %s"
-    users = db.execute_query(query, (username, password_hash))
+    # Busca pelo username e verifica o hash em Python: durante a migração
+    # para bcrypt a tabela mistura hashes MD5 legados e bcrypt-md5
+    query = "SELECT id, username, age, password FROM users WHERE username = %s"
+    users = db.execute_query(query, (username,))
     
-    if users:
-        return users[0]
+    if not users:
+        # Mesmo custo de hash de um usuário real (sem enumeração pelo tempo)
+        hashers.dummy_verify(password)
+        return None
+    if verify_password(password, users[0]["password"]):
+        user = users[0]
+        return {"id": user["id"], "username": user["username"], "age": user["age"]}
     return None
 
 def create_test_users():
@@ -199,7 +256,7 @@ def create_test_users():
             CREATE TABLE users (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(32) NOT NULL,
+                password VARCHAR(255) NOT NULL,
                 age INTEGER,
                 credit_card_number VARCHAR(16)
             )
@@ -207,6 +264,13 @@ def create_test_users():
             db.execute_update(create_table)
             print("Tabela 'users' criada com sucesso!")
         
+        # Índice no hash: buscas por senha (ex: /audit-passwords) sem full scan
+        db.execute_update("CREATE INDEX IF NOT EXISTS idx_users_password ON users (password)")
+        
+        # Tabela de tokens revogados (/logout)
+        revocation_store.ensure_schema()
+        refresh_store.ensure_schema()
+        
         # Insere usuários de teste
         alice_password = hash_password("alice123")
         bob_password = hash_password("bob123")
@@ -237,11 +301,26 @@ def build_auth_server():
         title="Servidor de autenticação para o OWASP TOP 10",
         description="Servidor de autenticação para o OWASP TOP 10 DB"
     )
+
+    @app.on_event("startup")
+    async def warm_public_keys():
+        # ES256/EdDSA: chave de assinatura criada e chaves públicas carregadas antes da primeira requisição
+        token_verifier.warm()
+    
+    @app.on_event("shutdown")
+    async def shutdown_pools():
+        async_db.shutdown()
+        close_pools()
+    
+    install_metrics(app)
+    install_timeout_handler(app)
     
     @app.post("/login", response_model=LoginResponse)
-    async def login(login_data: LoginRequest):
+    async def login(login_data: LoginRequest, request: Request):
         """Endpoint para login de usuários"""
-        user = authenticate_user(login_data.username, login_data.password)
+        # Limite por IP e por username antes do hash de senha (429 + Retry-After)
+        enforce(request, "login", login_data.username)
+        user = await async_db.run(authenticate_user, login_data.username, login_data.password)
         
         if not user:
             raise HTTPException(
@@ -250,37 +329,99 @@ def build_auth_server():
             )
         
         access_token = create_access_token(user["username"])
+        refresh_token = await async_db.run(refresh_store.issue, user["username"])
         
         return LoginResponse(
             access_token=access_token,
             token_type="bearer",
-            username=user["username"]
+            username=user["username"],
+            refresh_token=refresh_token
         )
     
+    @app.post("/token/refresh", response_model=LoginResponse)
+    async def refresh_access_token(refresh_data: RefreshRequest):
+        """
+        Troca o refresh token por um novo par de tokens, sem senha (sem hash)
+        
+        O refresh token usado é consumido; reapresentá-lo revoga a sessão.
+        """
+        try:
+            username, refresh_token = await async_db.run(refresh_store.rotate, refresh_data.refresh_token)
+        except RefreshTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        
+        # Usuário removido depois do login: a sessão termina aqui
+        exists = await async_db.execute_query("SELECT 1 FROM users WHERE username = %s", (username,))
+        if not exists:
+            await async_db.run(refresh_store.revoke, refresh_token)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        
+        return LoginResponse(
+            access_token=create_access_token(username),
+            token_type="bearer",
+            username=username,
+            refresh_token=refresh_token
+        )
+    
+    @app.post("/logout")
+    async def logout(
+        logout_data: Optional[LogoutRequest] = None,
+        credentials: HTTPAuthorizationCredentials = Depends(security)
+    ):
+        """Revoga o token atual até a sua expiração (e a sessão do refresh token, se enviado)"""
+        token = credentials.credentials
+        try:
+            # decode pode consultar o banco (is_revoked): fora do event loop
+            payload = await async_db.run(token_verifier.decode, token)
+        except jwt.PyJWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token"
+            )
+        if "jti" not in payload:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token cannot be revoked (no jti)"
+            )
+        expires_at = payload.get("exp") or time.time() + JWT_EXPIRE_MINUTES * 60
+        await async_db.run(revocation_store.revoke, payload["jti"], expires_at)
+        token_verifier.forget(token)
+        if logout_data and logout_data.refresh_token:
+            await async_db.run(refresh_store.revoke, logout_data.refresh_token)
+        return {"message": "Logged out"}
+    
     @app.get("/me", response_model=User)
     async def get_current_user_info(current_user: dict = Depends(get_current_user)):
         """Retorna informações do usuário autenticado"""
-        query = "SELECT id, username, age FROM users WHERE username = %s"
-        users = db.execute_query(query, (current_user["username"],))
+        user_data = await get_user_profile(async_db, current_user["username"])
         
-        if not users:
+        if not user_data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user_data = users[0]
-        return User(
-            id=user_data['id'],
-            username=user_data['username'],
-            age=user_data['age']
-        )
+        # Linha do banco: serializada direto, sem validar de novo
+        return trusted_response(user_data, User)
+    
+    @app.get("/.well-known/jwks.json")
+    async def jwks():
+        """Chaves públicas para verificar os tokens (vazio com HS256: o segredo nunca é publicado)"""
+        if not is_asymmetric(JWT_ALGORITHM):
+            return {"keys": []}
+        return get_signing_keys(JWT_ALGORITHM).jwks()
     
     @app.post("/setup")
     async def setup_test_data():
         """Cria dados de teste (usuários alice e bob)"""
         try:
-            create_test_users()
+            await async_db.run(create_test_users)
             return {"message": "Test users created successfully"}
         except Exception as e:
             raise HTTPException(
@@ -288,6 +429,16 @@ def build_auth_server():
                 detail=f"Error creating test users: {str(e)}"
             )
     
+    @app.get("/debug/cache-stats")
+    async def cache_stats():
+        """Estatísticas (hit ratio) dos caches de perfil e de tokens"""
+        return {
+            "profile_cache": profile_cache.stats(),
+            "token_cache": token_verifier.stats(),
+            "revocation": revocation_store.stats(),
+            "rate_limit": rate_limit_stats()
+        }
+    
     @app.get("/")
     async def root():
         return {
@@ -295,7 +446,11 @@ def build_auth_server():
             "endpoints": {
                 "/login": "POST - Login com nome de usuário/senha",
                 "/me": "GET - Obter informações do usuário atual (requer autenticação)",
-                "/setup": "POST - Criar usuários de teste alice e bob"
+                "/token/refresh": "POST - Novo par de tokens a partir do refresh token (sem senha)",
+                "/logout": "POST - Revogar o token atual (requer autenticação)",
+                "/setup": "POST - Criar usuários de teste alice e bob",
+                "/.well-known/jwks.json": "GET - Chaves públicas de verificação (JWT_ALGORITHM=ES256/EdDSA)",
+                "/debug/cache-stats": "GET - Estatísticas dos caches de perfil e de tokens"
             },
             "testa_usuarios": {
                 "alice": "password: alice123",
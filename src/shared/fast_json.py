@@ -0,0 +1,98 @@
+"""
+Serialização rápida de respostas JSON para linhas vindas do banco
+
+No caminho padrão do FastAPI um perfil é copiado campo a campo para um
+modelo pydantic, validado de novo pelo response_model e convertido por
+jsonable_encoder antes do json.dumps. Para dados que já vêm do nosso banco
+(tipos conhecidos) isso é trabalho repetido:
+- FastJSONResponse  serializa direto para bytes com orjson (json da
+                    biblioteca padrão se o orjson não estiver instalado)
+- trusted_response  monta a resposta sem validação; o response_model continua
+                    na rota apenas para a documentação (OpenAPI)
+- rows_to_dicts     converte as linhas de um cursor sqlite3 em dicts
+
+FAST_JSON=0 desliga o caminho rápido (as rotas voltam ao fluxo padrão), útil
+para comparar com serialization_bench.py.
+"""
+
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # está no requirements.txt; o json fica como rede de segurança
+    orjson = None
+
+load_dotenv()
+
+FAST_JSON = os.getenv("FAST_JSON", "1").lower() in ("1", "true", "yes")
+
+
+def _default(value):
+    # Tipos do psycopg2/sqlite3 que nenhum dos encoders trata sozinho
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).decode("utf-8", "replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def dumps(content):
+        return orjson.dumps(content, default=_default)
+
+else:
+
+    def dumps(content):
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa com `dumps` (sem jsonable_encoder)"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+_model_fields = {}
+
+
+def _fields_of(model):
+    fields = _model_fields.get(model)
+    if fields is None:
+        fields = _model_fields[model] = tuple(model.model_fields)
+    return fields
+
+
+def trusted_response(data, model=None, status_code=200):
+    """
+    Resposta para dados confiáveis do banco, sem validar de novo
+
+    Com `model`, apenas os campos do modelo pydantic são copiados (o mesmo
+    recorte que o response_model faria). Com FAST_JSON desligado retorna o
+    objeto comum, e o FastAPI segue o fluxo padrão de validação.
+    """
+    if model is not None:
+        if not FAST_JSON:
+            return model(**{field: data[field] for field in _fields_of(model)})
+        data = {field: data[field] for field in _fields_of(model)}
+    if not FAST_JSON:
+        return data
+    return FastJSONResponse(data, status_code=status_code)
+
+
+def rows_to_dicts(cursor):
+    """Linhas restantes do cursor como dicts, com os nomes das colunas"""
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
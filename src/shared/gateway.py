@@ -0,0 +1,131 @@
+"""
+Gateway: todos os servidores do workshop em um único processo ASGI
+
+Cada aplicação é montada sob um prefixo (ex: /a01/profile, /a03-secure/search)
+em vez de rodar em um processo uvicorn próprio. Os módulos compartilhados são
+importados uma única vez, então todas as aplicações usam o mesmo pool de
+conexões (pool.get_pool) e o mesmo verificador JWT (jwt_verifier.get_verifier).
+
+Os arquivos server.py/solution.py dos exercícios têm o mesmo nome: são
+carregados com importlib sob nomes únicos (workshop_<exercício>_<arquivo>)
+para não colidirem em sys.modules.
+
+Uso:
+    python src/shared/gateway.py
+"""
+
+import importlib
+import importlib.util
+import inspect
+import os
+import sys
+
+from fastapi import FastAPI
+
+from jwt_verifier import get_verifier
+from pool import close_pools, get_pool
+
+SHARED_DIR = os.path.abspath(os.path.dirname(__file__))
+SRC_DIR = os.path.dirname(SHARED_DIR)
+
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8080"))
+
+# (prefixo, arquivo relativo a src/, variável da aplicação ou função fábrica)
+MOUNTS = [
+    ("/auth", "shared/auth_server.py", "build_auth_server"),
+    ("/a01", "a01_access_control/server.py", "app"),
+    ("/a01-secure", "a01_access_control/solution.py", "create_secure_app"),
+    ("/a02", "a02_cryptographic_failure/server.py", "app"),
+    ("/a02-secure", "a02_cryptographic_failure/solution.py", "app"),
+    ("/a03", "a03_injection/server.py", "app"),
+    ("/a03-secure", "a03_injection/solution.py", "app"),
+]
+
+
+def load_module(relative_path):
+    """Importa um arquivo de src/ sem conflito de nomes entre exercícios"""
+    path = os.path.join(SRC_DIR, relative_path)
+    directory, filename = os.path.split(path)
+    stem = os.path.splitext(filename)[0]
+    if directory == SHARED_DIR:
+        # Módulos compartilhados usam o nome normal: uma única instância
+        return importlib.import_module(stem)
+
+    name = f"workshop_{os.path.basename(directory)}_{stem}"
+    if name in sys.modules:
+        return sys.modules[name]
+    # Os exercícios importam módulos vizinhos (routes, database, ...) pelo nome
+    if directory not in sys.path:
+        sys.path.append(directory)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def load_app(relative_path, attribute):
+    target = getattr(load_module(relative_path), attribute)
+    return target() if inspect.isfunction(target) else target
+
+
+async def _run_handlers(handlers):
+    for handler in handlers:
+        result = handler()
+        if inspect.isawaitable(result):
+            await result
+
+
+def create_gateway(mounts=MOUNTS):
+    """Cria a aplicação com todos os exercícios montados sob seus prefixos"""
+    gateway = FastAPI(
+        title="OWASP Top 10 Workshop - Gateway",
+        description="Todos os servidores do workshop em um único processo"
+    )
+    apps = []
+    for prefix, relative_path, attribute in mounts:
+        app = load_app(relative_path, attribute)
+        gateway.mount(prefix, app)
+        apps.append((prefix, app))
+
+    # Sub-aplicações montadas não recebem os eventos de lifespan: o gateway
+    # executa os handlers de startup/shutdown de cada uma
+    @gateway.on_event("startup")
+    async def startup_apps():
+        for _, app in apps:
+            await _run_handlers(app.router.on_startup)
+
+    @gateway.on_event("shutdown")
+    async def shutdown_apps():
+        for _, app in reversed(apps):
+            await _run_handlers(app.router.on_shutdown)
+        close_pools()
+
+    @gateway.get("/")
+    async def root():
+        return {
+            "mensagem": "OWASP Top 10 Workshop - Gateway",
+            "aplicacoes": {prefix: f"{prefix}/docs" for prefix, _ in apps}
+        }
+
+    @gateway.get("/gateway/stats")
+    async def gateway_stats():
+        """Estatísticas dos recursos compartilhados entre as aplicações"""
+        from auth import DATABASE_URL, JWT_ALGORITHM, JWT_SECRET
+
+        return {
+            "pool": get_pool(DATABASE_URL).stats(),
+            "jwt_cache": get_verifier(JWT_SECRET, JWT_ALGORITHM).stats(),
+        }
+
+    return gateway
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(create_gateway(), host="0.0.0.0", port=GATEWAY_PORT)
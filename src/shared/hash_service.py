@@ -0,0 +1,123 @@
+"""
+Serviço de hashing de senhas em processos separados
+
+bcrypt gasta 100-300 ms de CPU por chamada; executado dentro de um endpoint
+`async def`, ele congela o event loop do worker. HashingService envia esses
+jobs para um pool de processos (usando todos os núcleos), com fila limitada
+e timeout por job.
+
+Se um worker morrer (ex: OOM kill), o pool inteiro fica quebrado e todos os
+jobs falham com BrokenProcessPool: o serviço descarta o pool e o próximo job
+cria outro.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from dotenv import load_dotenv
+
+from metrics import password_hash_duration
+
+load_dotenv()
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "5"))
+
+
+class HashQueueFull(Exception):
+    """Há jobs de hashing demais aguardando processamento"""
+
+
+class HashTimeout(Exception):
+    """O job de hashing não terminou dentro do tempo limite"""
+
+
+class HashingService:
+    """
+    Executa funções de hash (CPU-bound) em um ProcessPoolExecutor
+
+    `max_pending` limita os jobs em andamento + na fila: acima disso, run()
+    falha imediatamente com HashQueueFull em vez de acumular latência.
+    As funções precisam ser picklable (definidas no nível do módulo).
+    """
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING, timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _release(self, executor, future):
+        with self._lock:
+            self._pending -= 1
+            broken = not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+            if broken and self._executor is executor:
+                # Um worker morreu durante o job: descarta o pool quebrado
+                self._executor = None
+
+    def submit(self, func, *args):
+        """Enfileira um job e retorna um concurrent.futures.Future"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashQueueFull(f"{self._pending} jobs de hashing pendentes")
+            self._pending += 1
+        executor = None
+        try:
+            executor = self._get_executor()
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            # Um worker morreu: descarta o pool para que o próximo job crie outro
+            with self._lock:
+                self._pending -= 1
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # A vaga só é liberada quando o processo termina o job (mesmo após timeout)
+        future.add_done_callback(functools.partial(self._release, executor))
+        return future
+
+    async def run(self, func, *args, timeout=None, scheme="other", operation=None):
+        """
+        Executa `func(*args)` em outro processo sem bloquear o event loop
+
+        `scheme` e `operation` rotulam o password_hash_duration_seconds (ex:
+        "bcrypt", "hash"), junto com o hashing feito no próprio processo.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = asyncio.wrap_future(self.submit(func, *args))
+        # Medido aqui (no processo do servidor), incluindo a espera na fila:
+        # as métricas registradas dentro do worker não chegam ao /metrics
+        with password_hash_duration.time(scheme, operation or func.__name__):
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise HashTimeout(f"Hashing excedeu o limite de {timeout:.1f}s")
+
+    def stats(self):
+        with self._lock:
+            return {"pending": self._pending, "max_pending": self.max_pending, "workers": self.workers}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,344 @@
+"""
+Registro de algoritmos de hash de senha
+
+Cada hasher produz hashes autodescritivos (o prefixo identifica o algoritmo e
+os parâmetros), então verify_password() aceita qualquer formato registrado:
+- md5     hex de 32 caracteres, sem prefixo (legado do workshop, INSEGURO)
+- bcrypt  $2b$<rounds>$...
+- scrypt  $scrypt$ln=<log2 N>,r=<r>,p=<p>$<salt>$<hash>
+- argon2  $argon2id$... (apenas se argon2-cffi estiver instalado)
+- bcrypt-md5  $bcrypt-md5$<bcrypt do hex md5> (migração dos hashes MD5 legados)
+
+Também inclui uma rotina de calibração que mede o custo de cada algoritmo
+nesta máquina e escolhe o maior custo que cabe em uma latência alvo (p99).
+
+Uso:
+    python src/shared/hashers.py --scheme bcrypt --target-ms 250
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import time
+
+from dotenv import load_dotenv
+from passlib.hash import bcrypt as passlib_bcrypt
+
+from metrics import password_hash_duration
+
+load_dotenv()
+
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "bcrypt")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+SCRYPT_LOG2_N = int(os.getenv("SCRYPT_LOG2_N", "15"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+
+_registry = {}
+
+
+def register(hasher_cls):
+    """Registra uma classe de hasher pelo seu `name`"""
+    _registry[hasher_cls.name] = hasher_cls
+    return hasher_cls
+
+
+class Hasher:
+    """
+    Interface comum dos algoritmos de hash
+
+    `cost` é o parâmetro de custo do algoritmo (rounds do bcrypt, log2 N do
+    scrypt, time_cost do argon2); `cost_range` limita a calibração.
+    """
+
+    name = None
+    prefix = None
+    default_cost = None
+    cost_range = (None, None)
+
+    def __init__(self, cost=None):
+        self.cost = self.default_cost if cost is None else cost
+
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    def verify(self, password: str, hashed: str) -> bool:
+        raise NotImplementedError
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(self.prefix)
+
+
+@register
+class MD5Hasher(Hasher):
+    name = "md5"
+    prefix = ""
+
+    _pattern = re.compile(r"^[0-9a-f]{32}$")
+
+    def hash(self, password: str) -> str:
+        return hashlib.md5(password.encode()).hexdigest()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return hmac.compare_digest(self.hash(password), hashed)
+
+    def identify(self, hashed: str) -> bool:
+        return bool(self._pattern.match(hashed))
+
+
+@register
+class BcryptHasher(Hasher):
+    name = "bcrypt"
+    prefix = "$2"
+    default_cost = BCRYPT_ROUNDS
+    cost_range = (4, 16)
+
+    def hash(self, password: str) -> str:
+        return passlib_bcrypt.using(rounds=self.cost).hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return passlib_bcrypt.verify(password, hashed)
+
+
+@register
+class BcryptMD5Hasher(BcryptHasher):
+    """
+    bcrypt aplicado sobre o hex MD5 da senha
+
+    Permite migrar hashes MD5 legados sem conhecer as senhas: wrap() converte
+    o MD5 armazenado e verify() recalcula o MD5 da senha digitada.
+    """
+
+    name = "bcrypt-md5"
+    prefix = "$bcrypt-md5$"
+
+    def wrap(self, md5_hex: str) -> str:
+        return self.prefix + super().hash(md5_hex)
+
+    def hash(self, password: str) -> str:
+        return self.wrap(MD5Hasher().hash(password))
+
+    def verify(self, password: str, hashed: str) -> bool:
+        inner = hashed[len(self.prefix):]
+        return super().verify(MD5Hasher().hash(password), inner)
+
+
+@register
+class ScryptHasher(Hasher):
+    name = "scrypt"
+    prefix = "$scrypt$"
+    default_cost = SCRYPT_LOG2_N
+    cost_range = (10, 20)
+
+    r = 8
+    p = 1
+
+    @staticmethod
+    def _b64encode(data):
+        return base64.b64encode(data).decode().rstrip("=")
+
+    @staticmethod
+    def _b64decode(text):
+        return base64.b64decode(text + "=" * (-len(text) % 4))
+
+    @staticmethod
+    def _derive(password, salt, log2_n, r, p):
+        n = 1 << log2_n
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * r * n * p + 1024 * 1024, dklen=32,
+        )
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.cost, self.r, self.p)
+        return (
+            f"$scrypt$ln={self.cost},r={self.r},p={self.p}"
+            f"${self._b64encode(salt)}${self._b64encode(digest)}"
+        )
+
+    def verify(self, password: str, hashed: str) -> bool:
+        try:
+            _, _, params, salt, digest = hashed.split("$")
+            values = dict(item.split("=") for item in params.split(","))
+            expected = self._derive(
+                password, self._b64decode(salt),
+                int(values["ln"]), int(values["r"]), int(values["p"]),
+            )
+        except (ValueError, KeyError):
+            return False
+        return hmac.compare_digest(expected, self._b64decode(digest))
+
+
+try:
+    import argon2
+except ImportError:  # argon2-cffi é opcional
+    argon2 = None
+
+if argon2 is not None:
+
+    @register
+    class Argon2Hasher(Hasher):
+        name = "argon2"
+        prefix = "$argon2"
+        default_cost = ARGON2_TIME_COST
+        cost_range = (1, 12)
+
+        def __init__(self, cost=None):
+            super().__init__(cost)
+            self._hasher = argon2.PasswordHasher(time_cost=self.cost)
+
+        def hash(self, password: str) -> str:
+            return self._hasher.hash(password)
+
+        def verify(self, password: str, hashed: str) -> bool:
+            try:
+                return self._hasher.verify(hashed, password)
+            except argon2.exceptions.VerificationError:
+                return False
+            except argon2.exceptions.InvalidHashError:
+                return False
+
+
+def available_hashers():
+    return sorted(_registry)
+
+
+def get_hasher(name=PASSWORD_HASHER, cost=None) -> Hasher:
+    try:
+        return _registry[name](cost)
+    except KeyError:
+        raise ValueError(f"Algoritmo de hash desconhecido: {name}")
+
+
+def identify_hasher(hashed: str) -> Hasher:
+    """Descobre o algoritmo de um hash armazenado pelo seu formato"""
+    # O md5 não tem prefixo: testa os formatos com prefixo primeiro
+    for cls in sorted(_registry.values(), key=lambda c: not c.prefix):
+        hasher = cls()
+        if hasher.identify(hashed):
+            return hasher
+    raise ValueError("Formato de hash não reconhecido")
+
+
+def hash_password(password: str, scheme=PASSWORD_HASHER) -> str:
+    with password_hash_duration.time(scheme, "hash"):
+        return get_hasher(scheme).hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verifica a senha contra um hash em qualquer formato registrado"""
+    try:
+        hasher = identify_hasher(hashed)
+    except ValueError:
+        return False
+    with password_hash_duration.time(hasher.name, "verify"):
+        return hasher.verify(password, hashed)
+
+
+_dummy_hashes = {}
+
+
+def dummy_verify(password: str, scheme=PASSWORD_HASHER) -> bool:
+    """
+    Verifica a senha contra um hash descartável do algoritmo padrão
+
+    Para usuários inexistentes: o login gasta o mesmo tempo de hash que um
+    usuário real, então a latência não revela quais usernames existem.
+    Sempre retorna False.
+    """
+    hashed = _dummy_hashes.get(scheme)
+    if hashed is None:
+        hashed = _dummy_hashes[scheme] = get_hasher(scheme).hash(secrets.token_hex(16))
+    verify_password(password, hashed)
+    return False
+
+
+def _percentile(sorted_values, percentile):
+    index = min(len(sorted_values) - 1, max(0, round(percentile / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def benchmark(hasher: Hasher, samples=10):
+    """
+    Mede a latência de verify() em um único núcleo
+
+    Retorna p50/p99 em milissegundos e hashes por segundo por núcleo.
+    """
+    password = "calibration-password"
+    hashed = hasher.hash(password)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(password, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    mean_ms = sum(timings) / len(timings)
+    return {
+        "scheme": hasher.name,
+        "cost": hasher.cost,
+        "p50_ms": _percentile(timings, 50),
+        "p99_ms": _percentile(timings, 99),
+        "hashes_per_sec_per_core": 1000 / mean_ms if mean_ms else float("inf"),
+    }
+
+
+def calibrate(scheme, target_ms=250, samples=10):
+    """
+    Escolhe o maior custo cujo verify() fica dentro de `target_ms` no p99
+
+    Os custos são testados em ordem crescente e a busca para no primeiro que
+    estoura o orçamento (o custo cresce de forma monotônica).
+    Retorna (resultado escolhido, lista de todas as medições).
+    """
+    cls = _registry[scheme]
+    low, high = cls.cost_range
+    if low is None:
+        result = benchmark(cls(), samples)
+        return result, [result]
+
+    chosen = None
+    results = []
+    for cost in range(low, high + 1):
+        result = benchmark(cls(cost), samples)
+        results.append(result)
+        if result["p99_ms"] > target_ms:
+            break
+        chosen = result
+    return chosen, results
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibra o custo dos algoritmos de hash de senha")
+    parser.add_argument("--scheme", choices=available_hashers(), action="append",
+                        help="Algoritmo a calibrar (padrão: todos)")
+    parser.add_argument("--target-ms", type=float, default=250, help="Latência alvo de verify no p99")
+    parser.add_argument("--samples", type=int, default=10, help="Medições por custo")
+    args = parser.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    for scheme in args.scheme or available_hashers():
+        chosen, results = calibrate(scheme, args.target_ms, samples=args.samples)
+        print(f"\n🔐 {scheme}")
+        for result in results:
+            cost = "-" if result["cost"] is None else result["cost"]
+            print(
+                f"   custo={cost!s:>4}  p50={result['p50_ms']:8.2f} ms"
+                f"  p99={result['p99_ms']:8.2f} ms"
+                f"  {result['hashes_per_sec_per_core']:10.1f} hashes/s/núcleo"
+            )
+        if chosen is None:
+            print(f"   ❌ Nenhum custo cabe em {args.target_ms:.0f} ms")
+            continue
+        per_node = chosen["hashes_per_sec_per_core"] * cores
+        if chosen["cost"] is not None:
+            print(f"   ✅ Custo recomendado: {chosen['cost']} (p99 {chosen['p99_ms']:.1f} ms)")
+        print(f"   📈 Capacidade estimada: {per_node:.1f} logins/s por nó ({cores} núcleos)")
+
+
+if __name__ == "__main__":
+    main()
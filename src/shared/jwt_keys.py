@@ -0,0 +1,283 @@
+"""
+Chaves assimétricas para tokens JWT (ES256/EdDSA) com `kid` e JWKS
+
+Com JWT_ALGORITHM=HS256 (padrão) nada muda: todos os nós assinam e verificam
+com o JWT_SECRET. Com ES256 ou EdDSA:
+- o servidor de autenticação assina com a chave privada ativa de
+  JWT_KEYS_DIR (um arquivo <kid>.pem por chave; a mais recente é a ativa,
+  ou a indicada em JWT_ACTIVE_KID) e coloca o `kid` no header do token
+- /.well-known/jwks.json publica as chaves públicas de todas as chaves do
+  diretório, então tokens assinados com uma chave antiga continuam válidos
+  até ela ser removida
+- os demais nós verificam localmente com as chaves públicas já parseadas,
+  em um dict indexado pelo `kid` (leitura sem lock). O dict é trocado
+  inteiro por uma thread de fundo a cada JWKS_REFRESH_SECONDS, vindo de
+  JWKS_URL (ou de JWT_KEYS_DIR, se JWKS_URL não estiver definida). O
+  primeiro carregamento acontece no startup da aplicação (start()). Um `kid`
+  desconhecido é recusado na hora e antecipa a próxima atualização da thread
+  (no máximo uma a cada JWKS_MIN_REFRESH_SECONDS): a requisição nunca espera
+  pelo JWKS.
+
+Rotação sem downtime: gere a nova chave (`python src/shared/jwt_keys.py
+rotate`), espere os nós atualizarem o JWKS e reinicie o servidor de
+autenticação (ou defina JWT_ACTIVE_KID) para assinar com ela.
+"""
+
+import argparse
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.request
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", ".jwt_keys")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+JWKS_URL = os.getenv("JWKS_URL")
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "300"))
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "30"))
+JWKS_TIMEOUT = float(os.getenv("JWKS_TIMEOUT", "5"))
+
+ASYMMETRIC_ALGORITHMS = ("ES256", "EdDSA")
+
+
+def is_asymmetric(algorithm):
+    return algorithm in ASYMMETRIC_ALGORITHMS
+
+
+def _generate_private_key(algorithm):
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"Algoritmo sem par de chaves: {algorithm}")
+
+
+def _matches(algorithm, private_key):
+    if algorithm == "ES256":
+        return isinstance(private_key, ec.EllipticCurvePrivateKey) and private_key.curve.name == "secp256r1"
+    return isinstance(private_key, ed25519.Ed25519PrivateKey)
+
+
+def public_jwk(kid, algorithm, public_key):
+    jwk = jwt.get_algorithm_by_name(algorithm).to_jwk(public_key, as_dict=True)
+    jwk.update({"kid": kid, "alg": algorithm, "use": "sig"})
+    return jwk
+
+
+class SigningKeys:
+    """Chaves privadas de JWT_KEYS_DIR; com create=True cria a primeira se não houver nenhuma"""
+
+    def __init__(self, algorithm, directory=JWT_KEYS_DIR, active_kid=JWT_ACTIVE_KID, create=True):
+        if not is_asymmetric(algorithm):
+            raise ValueError(f"Algoritmo sem par de chaves: {algorithm}")
+        self.algorithm = algorithm
+        self.directory = directory
+        self.requested_kid = active_kid
+        self.reload()
+        if create and not self._keys:
+            self.rotate()
+
+    def reload(self):
+        keys = {}
+        if os.path.isdir(self.directory):
+            for filename in sorted(os.listdir(self.directory)):
+                if not filename.endswith(".pem"):
+                    continue
+                with open(os.path.join(self.directory, filename), "rb") as f:
+                    private_key = serialization.load_pem_private_key(f.read(), password=None)
+                # Chaves de outro algoritmo (ex: depois de trocar JWT_ALGORITHM) são ignoradas
+                if _matches(self.algorithm, private_key):
+                    keys[filename[:-4]] = private_key
+        self._keys = keys
+        if self.requested_kid in keys:
+            self.active_kid = self.requested_kid
+        else:
+            # kids começam com o timestamp de criação: a maior é a mais recente
+            self.active_kid = max(keys) if keys else None
+
+    def rotate(self):
+        """Gera uma nova chave (que passa a ser a ativa) e retorna o kid"""
+        seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+        kid = f"{time.strftime('%Y%m%d%H%M%S', time.gmtime(seconds))}{micros:06d}-{secrets.token_hex(4)}"
+        private_key = _generate_private_key(self.algorithm)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        path = os.path.join(self.directory, f"{kid}.pem")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        os.replace(tmp_path, path)
+        self.requested_kid = kid
+        self.reload()
+        return kid
+
+    def sign(self, payload):
+        return jwt.encode(
+            payload, self._keys[self.active_kid], algorithm=self.algorithm,
+            headers={"kid": self.active_kid},
+        )
+
+    def public_keys(self):
+        return {kid: key.public_key() for kid, key in self._keys.items()}
+
+    def jwks(self):
+        return {"keys": [public_jwk(kid, self.algorithm, key) for kid, key in self.public_keys().items()]}
+
+
+def fetch_jwks(url, algorithm, timeout=JWKS_TIMEOUT):
+    """Baixa um JWKS e retorna {kid: chave pública parseada}"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        document = json.load(response)
+    keys = {}
+    for jwk in document.get("keys", []):
+        if jwk.get("kid") and jwk.get("alg", algorithm) == algorithm:
+            keys[jwk["kid"]] = jwt.PyJWK(jwk, algorithm).key
+    return keys
+
+
+class PublicKeyCache:
+    """
+    Chaves públicas por `kid`, atualizadas em background
+
+    `load()` retorna o dict completo de chaves; get() só lê o dict atual.
+    """
+
+    def __init__(self, load, refresh_interval=JWKS_REFRESH_SECONDS, min_refresh_interval=JWKS_MIN_REFRESH_SECONDS):
+        self._load = load
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._last_refresh = float("-inf")
+        self._thread_pid = None
+        self._reset_locks()
+        self.refreshes = 0
+        self.errors = 0
+        if hasattr(os, "register_at_fork"):
+            # Locks presos por outra thread no momento do fork nunca seriam soltos no filho
+            os.register_at_fork(after_in_child=self._reset_locks)
+
+    def _reset_locks(self):
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def refresh(self):
+        with self._refresh_lock:
+            try:
+                keys = self._load()
+            except Exception:
+                # Mantém as chaves atuais: o JWKS pode estar fora do ar por um momento
+                self.errors += 1
+                return False
+            finally:
+                self._last_refresh = time.monotonic()
+            self._keys = keys
+            self.refreshes += 1
+            return True
+
+    def _refresh_loop(self):
+        while True:
+            # Acordada antes do intervalo quando aparece um kid desconhecido
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            self.refresh()
+
+    def start(self):
+        """Carrega as chaves e inicia a thread de atualização (uma por processo)"""
+        if self._thread_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid():
+                return
+            # Threads não sobrevivem ao fork dos workers: cada processo inicia a sua
+            self.refresh()
+            threading.Thread(target=self._refresh_loop, name="jwks-refresh", daemon=True).start()
+            self._thread_pid = os.getpid()
+
+    def get(self, kid):
+        """Chave pública do kid; lança jwt.InvalidTokenError se ela não existir"""
+        self.start()
+        key = self._keys.get(kid)
+        if key is None:
+            if time.monotonic() - self._last_refresh >= self.min_refresh_interval:
+                # kid novo (rotação): a thread atualiza agora, sem bloquear a requisição
+                self._wake.set()
+            raise jwt.InvalidTokenError("Unknown key id")
+        return key
+
+    def stats(self):
+        return {"kids": sorted(self._keys), "refreshes": self.refreshes, "errors": self.errors}
+
+
+_signing_keys = {}
+_public_keys = {}
+_lock = threading.Lock()
+
+
+def get_signing_keys(algorithm):
+    with _lock:
+        if algorithm not in _signing_keys:
+            _signing_keys[algorithm] = SigningKeys(algorithm)
+        return _signing_keys[algorithm]
+
+
+def ensure_local_keys(algorithm):
+    """
+    Sem JWKS_URL as chaves públicas vêm de JWT_KEYS_DIR: cria (ou carrega) a
+    chave de assinatura antes do primeiro carregamento do cache
+
+    Chamado no startup e no pai do launcher antes do fork. Sem isso o cache
+    carregaria um diretório vazio e o token assinado logo depois (com a chave
+    criada sob demanda) teria um kid desconhecido; com vários workers, cada
+    um criaria a sua própria chave ativa.
+    """
+    if is_asymmetric(algorithm) and not JWKS_URL:
+        get_signing_keys(algorithm)
+
+
+def get_public_keys(algorithm):
+    """Cache de chaves públicas do processo: do JWKS_URL, ou de JWT_KEYS_DIR"""
+    with _lock:
+        cache = _public_keys.get(algorithm)
+        if cache is None:
+            if JWKS_URL:
+                def load():
+                    return fetch_jwks(JWKS_URL, algorithm)
+            else:
+                def load():
+                    return SigningKeys(algorithm, create=False).public_keys()
+            cache = _public_keys[algorithm] = PublicKeyCache(load)
+        return cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerencia as chaves de assinatura JWT")
+    parser.add_argument("command", choices=["rotate", "list", "jwks"])
+    parser.add_argument("--algorithm", default=os.getenv("JWT_ALGORITHM", "ES256"), choices=ASYMMETRIC_ALGORITHMS)
+    args = parser.parse_args(argv)
+
+    keys = SigningKeys(args.algorithm, create=False)
+    if args.command == "rotate":
+        print(f"Nova chave ativa: {keys.rotate()}")
+    elif args.command == "list":
+        for kid in sorted(keys.public_keys()):
+            print(f"{kid}{' (ativa)' if kid == keys.active_kid else ''}")
+    else:
+        print(json.dumps(keys.jwks(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Verificação de tokens JWT com cache dos tokens já validados
+
+O mesmo cliente envia o mesmo bearer token milhares de vezes; em vez de
+decodificar e verificar a assinatura a cada requisição, o payload verificado
+fica em um cache LRU indexado pelo SHA-256 do token, válido até o `exp` do
+token.
+
+Com HS256 a chave é o JWT_SECRET; com ES256/EdDSA é a chave pública do `kid`
+do header, vinda do cache de chaves de jwt_keys.py.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+import jwt
+from dotenv import load_dotenv
+
+from cache import TTLCache
+from jwt_keys import ensure_local_keys, get_public_keys, is_asymmetric
+from metrics import jwt_verify_duration
+
+load_dotenv()
+
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+# Tokens sem `exp` (ou com `exp` muito distante) ficam no máximo isso no cache
+JWT_CACHE_MAX_TTL = float(os.getenv("JWT_CACHE_MAX_TTL", "300"))
+
+
+class TokenVerifier:
+    """
+    Decodifica tokens JWT, reaproveitando verificações anteriores
+
+    `is_revoked(payload)`, se informado, é consultado em toda chamada,
+    inclusive nos acertos do cache, para que um token revogado nunca seja
+    aceito. `public_keys` (ex: jwt_keys.PublicKeyCache) substitui o
+    `secret` nos algoritmos assimétricos: get(kid) retorna a chave pública.
+    """
+
+    def __init__(
+        self,
+        secret,
+        algorithm,
+        cache_size=JWT_CACHE_SIZE,
+        max_ttl=JWT_CACHE_MAX_TTL,
+        is_revoked=None,
+        public_keys=None,
+    ):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.max_ttl = max_ttl
+        self.is_revoked = is_revoked
+        self.public_keys = public_keys
+        self._cache = TTLCache(maxsize=cache_size)
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def _verification_key(self, token):
+        if self.public_keys is None:
+            return self.secret
+        return self.public_keys.get(jwt.get_unverified_header(token).get("kid"))
+
+    def decode(self, token):
+        """Retorna o payload do token; lança jwt.PyJWTError se for inválido"""
+        started = time.perf_counter()
+        key = self._key(token)
+        payload = self._cache.get(key)
+        cache = "hit"
+        if payload is None:
+            cache = "miss"
+            payload = jwt.decode(token, self._verification_key(token), algorithms=[self.algorithm])
+            expires_at = time.time() + self.max_ttl
+            exp = payload.get("exp")
+            if exp is not None:
+                expires_at = min(expires_at, exp)
+            self._cache.set(key, payload, expires_at=expires_at)
+        jwt_verify_duration.observe(time.perf_counter() - started, cache)
+
+        if self.is_revoked is not None and self.is_revoked(payload):
+            self._cache.pop(key)
+            raise jwt.InvalidTokenError("Token revoked")
+        return payload
+
+    def warm(self):
+        """Carrega as chaves públicas antes da primeira requisição (startup)"""
+        if self.public_keys is not None:
+            ensure_local_keys(self.algorithm)
+            self.public_keys.start()
+
+    def forget(self, token):
+        """Remove um token do cache (ex: logout)"""
+        self._cache.pop(self._key(token))
+
+    def stats(self):
+        return self._cache.stats()
+
+
+_verifiers = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_verifier(secret, algorithm):
+    """Verificador compartilhado por todos os apps do processo com a mesma chave"""
+    key = (secret, algorithm)
+    verifier = _verifiers.get(key)
+    if verifier is None:
+        with _verifiers_lock:
+            verifier = _verifiers.get(key)
+            if verifier is None:
+                public_keys = get_public_keys(algorithm) if is_asymmetric(algorithm) else None
+                verifier = _verifiers[key] = TokenVerifier(secret, algorithm, public_keys=public_keys)
+    return verifier
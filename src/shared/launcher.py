@@ -0,0 +1,227 @@
+"""
+Launcher multi-worker (prefork) para os servidores do workshop
+
+`uvicorn.run(app, ...)` no fim de cada módulo usa um único núcleo. O launcher
+abre o socket uma vez e cria N workers com fork, todos aceitando conexões
+no mesmo socket:
+- o processo pai pré-carrega o estado somente leitura (imports, hashers,
+  template do A03) e chama o `preload()` do módulo, se existir; as páginas
+  ficam compartilhadas entre os workers (copy-on-write)
+- a aplicação é criada em cada worker depois do fork (fábricas como
+  build_auth_server/create_gateway rodam no filho); pools de conexão
+  herdados são descartados no fork (ver pool.py)
+- cada worker é reciclado após --max-requests requisições (com jitter, para
+  não reiniciarem todos juntos) e o pai cria outro no lugar
+- um worker que falha nos primeiros LAUNCHER_STARTUP_SECONDS (erro de
+  import, porta, configuração) encerra o launcher: recriá-lo só repetiria o
+  erro. Depois disso, um worker que cai é recriado com espera exponencial
+  (até LAUNCHER_BACKOFF_MAX segundos) se as quedas se repetirem
+
+Apenas POSIX (usa os.fork).
+
+Uso:
+    python src/shared/launcher.py a03-secure --workers 4 --max-requests 10000
+    python src/shared/launcher.py gateway --workers 8
+"""
+
+import argparse
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from gateway import MOUNTS, load_app, load_module
+
+load_dotenv()
+
+LAUNCHER_WORKERS = int(os.getenv("LAUNCHER_WORKERS", str(os.cpu_count() or 1)))
+LAUNCHER_MAX_REQUESTS = int(os.getenv("LAUNCHER_MAX_REQUESTS", "0"))
+LAUNCHER_MAX_REQUESTS_JITTER = int(os.getenv("LAUNCHER_MAX_REQUESTS_JITTER", "0"))
+# Saída com erro até este tempo após o fork = falha de inicialização
+LAUNCHER_STARTUP_SECONDS = float(os.getenv("LAUNCHER_STARTUP_SECONDS", "10"))
+LAUNCHER_BACKOFF_MAX = float(os.getenv("LAUNCHER_BACKOFF_MAX", "30"))
+
+# nome -> (arquivo relativo a src/, aplicação ou fábrica, porta padrão)
+APPS = {
+    "auth": ("shared/auth_server.py", "build_auth_server", 8000),
+    "a01": ("a01_access_control/server.py", "app", 8001),
+    "a01-secure": ("a01_access_control/solution.py", "create_secure_app", 8002),
+    "a02": ("a02_cryptographic_failure/server.py", "app", 8003),
+    "a02-secure": ("a02_cryptographic_failure/solution.py", "app", 8004),
+    "a03": ("a03_injection/server.py", "app", 8005),
+    "a03-secure": ("a03_injection/solution.py", "app", 8006),
+    "gateway": ("shared/gateway.py", "create_gateway", 8080),
+}
+
+
+def preload(relative_path):
+    """Carrega no pai tudo que os workers só leem, antes do fork"""
+    import fastapi  # noqa: F401
+    import hashers  # noqa: F401
+    from jwt_keys import ensure_local_keys
+
+    # ES256/EdDSA: a chave de assinatura é criada uma vez no pai, e não uma por worker
+    ensure_local_keys(os.getenv("JWT_ALGORITHM", "HS256"))
+
+    if relative_path == "shared/gateway.py":
+        paths = [path for _, path, _ in MOUNTS]
+    else:
+        paths = [relative_path]
+    for path in paths:
+        module = load_module(path)
+        if hasattr(module, "preload"):
+            module.preload()
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(relative_path, attribute, sock, max_requests, jitter, log_level):
+    """Corpo do processo filho: cria a aplicação e atende no socket herdado"""
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    limit = None
+    if max_requests:
+        limit = max_requests + random.Random(os.getpid()).randint(0, jitter)
+    config = uvicorn.Config(
+        load_app(relative_path, attribute),
+        limit_max_requests=limit,
+        log_level=log_level,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Launcher:
+    def __init__(self, name, workers, host, port, max_requests=0, jitter=0, log_level="info"):
+        self.relative_path, self.attribute, default_port = APPS[name]
+        self.name = name
+        self.workers = workers
+        self.host = host
+        self.port = port or default_port
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.log_level = log_level
+        # pid -> instante do fork (time.monotonic)
+        self.children = {}
+        self.stopping = False
+        self.sock = None
+        self.crashes = 0
+        self.last_crash = float("-inf")
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(
+                    self.relative_path, self.attribute, self.sock,
+                    self.max_requests, self.jitter, self.log_level,
+                )
+            except BaseException:
+                import traceback
+
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def respawn_delay(self, status, uptime):
+        """
+        Segundos até recriar o worker que saiu com `status`, ou None para encerrar
+
+        Reciclagem (código 0) é recriada na hora; falha de inicialização
+        encerra; quedas depois disso esperam 0.5s, 1s, 2s... até
+        LAUNCHER_BACKOFF_MAX (a contagem zera após um período sem quedas).
+        """
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+            return 0.0
+        if os.WIFEXITED(status) and uptime < LAUNCHER_STARTUP_SECONDS:
+            return None
+        now = time.monotonic()
+        if now - self.last_crash > 2 * LAUNCHER_BACKOFF_MAX:
+            self.crashes = 0
+        self.last_crash = now
+        delay = min(LAUNCHER_BACKOFF_MAX, 0.5 * 2 ** self.crashes)
+        self.crashes += 1
+        return delay
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        preload(self.relative_path)
+        self.sock = bind_socket(self.host, self.port)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"🚀 {self.name}: {self.workers} workers em http://{self.host}:{self.port} (pai {os.getpid()})")
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if self.stopping or started is None:
+                continue
+            delay = self.respawn_delay(status, time.monotonic() - started)
+            if delay is None:
+                # Worker quebrado na inicialização: recriar em loop só gastaria CPU
+                print(f"❌ Worker {pid} saiu com código {os.WEXITSTATUS(status)} ao iniciar, encerrando")
+                self.stop()
+                continue
+            if delay:
+                print(f"⚠️  Worker {pid} caiu, recriando em {delay:.1f}s")
+                time.sleep(delay)
+                if self.stopping:
+                    continue
+            # Worker reciclado (--max-requests), morto por sinal ou que caiu: cria outro no lugar
+            self.spawn()
+
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa um servidor do workshop com vários workers")
+    parser.add_argument("app", choices=sorted(APPS))
+    parser.add_argument("--workers", type=int, default=LAUNCHER_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=None, help="Padrão: a porta usual da aplicação")
+    parser.add_argument("--max-requests", type=int, default=LAUNCHER_MAX_REQUESTS,
+                        help="Recicla o worker após N requisições (0 = nunca)")
+    parser.add_argument("--max-requests-jitter", type=int, default=LAUNCHER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        sys.exit("O launcher precisa de os.fork (Linux/macOS)")
+
+    Launcher(
+        args.app, args.workers, args.host, args.port,
+        args.max_requests, args.max_requests_jitter, args.log_level,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Métricas no formato de exposição de texto do Prometheus
+
+Registro em memória (por processo) de contadores e histogramas:
+- http_requests_total / http_request_duration_seconds  por app, rota e status
+- db_query_duration_seconds                 por banco e fingerprint da SQL
+                                            (até METRICS_MAX_FINGERPRINTS; o resto vira "other")
+- jwt_verify_duration_seconds               decodificação de tokens (cache hit/miss)
+- password_hash_duration_seconds            hash/verify de senhas por algoritmo
+
+install_metrics(app) adiciona o middleware ASGI e o endpoint /metrics. O
+caminho quente só faz um bisect nos limites do histograma e incrementos sob
+um lock; a formatação do texto acontece apenas no /metrics.
+"""
+
+import bisect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Limite de fingerprints distintos no db_query_duration_seconds: SQL montada
+# por concatenação (A03 vulnerável) geraria uma série nova por requisição
+METRICS_MAX_FINGERPRINTS = int(os.getenv("METRICS_MAX_FINGERPRINTS", "200"))
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Response acrescenta "; charset=utf-8" aos tipos text/*
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [contagem por faixa (não acumulada) + +Inf, soma]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += seconds
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                label_text = _format_labels(self.labelnames, labels, [("le", le)])
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {total}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "Requisições HTTP atendidas", ("app", "method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP", ("app", "method", "route", "status")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Duração das consultas SQL por fingerprint", ("db", "fingerprint")
+)
+jwt_verify_duration = registry.histogram(
+    "jwt_verify_duration_seconds", "Tempo de verificação de tokens JWT", ("cache",)
+)
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds", "Tempo de hash/verify de senhas", ("scheme", "operation"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    SQL normalizada: literais e placeholders viram `?` e espaços são colapsados
+
+    Consultas que só diferem nos valores (inclusive as montadas com
+    concatenação no A03 vulnerável) caem no mesmo fingerprint.
+    """
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    normalized = _IN_LIST.sub("(?)", normalized)
+    return normalized[:500]
+
+
+class FingerprintLimiter:
+    """
+    Admite os primeiros `maxsize` fingerprints; os demais viram "other"
+
+    Descartar um fingerprint antigo para admitir um novo não reduziria as
+    séries já exportadas pelo histograma, então o conjunto só cresce até o limite.
+    """
+
+    def __init__(self, maxsize=METRICS_MAX_FINGERPRINTS):
+        self.maxsize = maxsize
+        self._known = set()
+        self._lock = threading.Lock()
+
+    def label(self, value):
+        if value in self._known:
+            return value
+        with self._lock:
+            if len(self._known) < self.maxsize:
+                self._known.add(value)
+                return value
+        return "other"
+
+
+_fingerprints = FingerprintLimiter()
+
+
+def observe_query(db, sql, seconds):
+    db_query_duration.observe(seconds, db, _fingerprints.label(fingerprint(sql)))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: conta e cronometra cada requisição HTTP pela rota (template)"""
+
+    def __init__(self, app, fastapi_app, app_name):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.app_name = app_name
+        self._route_paths = None
+
+    def _route_path(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        if self._route_paths is None or endpoint not in self._route_paths:
+            # Rotas podem ser registradas depois do install_metrics()
+            self._route_paths = {
+                getattr(route, "endpoint", None): route.path
+                for route in self.fastapi_app.routes
+                if hasattr(route, "path")
+            }
+        return self._route_paths.get(endpoint, "<unmatched>")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            labels = (self.app_name, scope["method"], self._route_path(scope), str(status[0]))
+            http_request_duration.observe(time.perf_counter() - started, *labels)
+            http_requests_total.inc(*labels)
+
+
+def install_metrics(app, app_name=None):
+    """Adiciona o middleware de métricas e o endpoint /metrics à aplicação"""
+    from fastapi.responses import Response
+
+    app.add_middleware(MetricsMiddleware, fastapi_app=app, app_name=app_name or app.title)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    return app
@@ -0,0 +1,300 @@
+"""
+Pool de conexões PostgreSQL compartilhado pelo workshop
+
+Este módulo evita o custo de abrir uma conexão (TCP + autenticação) a cada query:
+- Tamanho mínimo/máximo configurável
+- Health check das conexões no checkout
+- Reciclagem de conexões ociosas
+- Estatísticas de checkouts, esperas e timeouts
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_CHECK_INTERVAL = float(os.getenv("DB_POOL_CHECK_INTERVAL", "30"))
+
+
+class PoolTimeout(PoolError):
+    """Nenhuma conexão ficou livre dentro do tempo limite"""
+
+
+class PooledConnection:
+    """
+    Proxy para uma conexão do pool
+
+    Repassa todos os atributos para a conexão psycopg2 real, mas close()
+    devolve a conexão ao pool em vez de encerrá-la.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(conn, name)
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn)
+
+
+class ConnectionPool:
+    """
+    Pool thread-safe de conexões psycopg2
+
+    As conexões ociosas ficam em uma pilha (LIFO): as mais usadas continuam
+    quentes e as do fundo envelhecem até serem recicladas após `max_idle`
+    segundos, mantendo sempre ao menos `min_size` conexões abertas. As
+    `min_size` primeiras são abertas já na criação do pool, então a primeira
+    requisição não paga o custo da conexão; se o banco estiver fora do ar a
+    criação falha e o próximo get_pool() tenta de novo.
+    """
+
+    def __init__(
+        self,
+        dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        max_idle=DB_POOL_MAX_IDLE,
+        check_interval=DB_POOL_CHECK_INTERVAL,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamanho de pool inválido")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+
+        self._idle = deque()  # (conexão, instante em que foi devolvida)
+        self._size = 0  # conexões abertas: ociosas + em uso
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+        self._open_min_size()
+
+    def _open_min_size(self):
+        opened = []
+        try:
+            for _ in range(self.min_size):
+                opened.append(self._connect())
+        except Exception:
+            for conn in opened:
+                conn.close()
+            raise
+        now = time.monotonic()
+        self._idle.extend((conn, now) for conn in opened)
+        self._size = self._stats["created"] = len(opened)
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+    def _is_healthy(self, conn, idle_since):
+        """Descarta conexões fechadas e testa as que ficaram ociosas por muito tempo"""
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _prune_idle(self, now):
+        """Remove conexões ociosas há mais de `max_idle` (chamado com o lock)"""
+        expired = []
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats["recycled"] += 1
+            expired.append(conn)
+        return expired
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        """Retira uma conexão do pool, esperando até `timeout` segundos"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                expired = self._prune_idle(time.monotonic())
+                conn = idle_since = None
+                while True:
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Nenhuma conexão disponível após {timeout:.1f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+            for old in expired:
+                old.close()
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+                    self._stats["checkouts"] += 1
+                return conn
+
+            if self._is_healthy(conn, idle_since):
+                with self._cond:
+                    self._stats["checkouts"] += 1
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn):
+        """Devolve uma conexão ao pool, desfazendo transações pendentes"""
+        if conn.closed or self._closed:
+            self._discard(conn)
+            return
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def checkout(self, timeout=None):
+        """Retorna um PooledConnection (close() devolve a conexão ao pool)"""
+        return PooledConnection(self, self.getconn(timeout))
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Fecha todas as conexões ociosas e impede novos checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        """Snapshot das estatísticas do pool"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot["size"] = self._size
+            snapshot["idle"] = len(self._idle)
+            snapshot["in_use"] = self._size - len(self._idle)
+        return snapshot
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn):
+    """Retorna o pool compartilhado para a DSN, criando-o no primeiro uso"""
+    pool = _pools.get(dsn)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(dsn)
+            if pool is None:
+                pool = _pools[dsn] = ConnectionPool(dsn)
+    return pool
+
+
+# Pools herdados do processo pai: mantidos vivos para que o coletor de lixo
+# não feche, no filho, conexões (sockets) que ainda pertencem ao pai
+_inherited_pools = []
+
+
+def _reset_after_fork():
+    """No processo filho: descarta os pools herdados; novos são criados sob demanda"""
+    global _pools_lock
+    _inherited_pools.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close_pools():
+    """Fecha todos os pools (usado no shutdown dos servidores)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
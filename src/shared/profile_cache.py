@@ -0,0 +1,41 @@
+"""
+Cache read-through dos perfis de usuário (id, username, age)
+
+/profile e /me executam a mesma consulta a cada requisição, mas os dados do
+perfil quase nunca mudam. As linhas ficam em um cache TTL+LRU indexado pelo
+username; qualquer escrita na tabela users deve chamar invalidate_profile().
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+from cache import TTLCache
+
+load_dotenv()
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+
+PROFILE_QUERY = "SELECT id, username, age FROM users WHERE username = %s"
+
+profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+async def get_user_profile(async_db, username):
+    """Retorna o perfil do usuário (dict) ou None se ele não existir"""
+    user = profile_cache.get(username)
+    if user is None:
+        users = await async_db.execute_query(PROFILE_QUERY, (username,))
+        if not users:
+            # Resultados negativos não são cacheados: um usuário criado depois
+            # já aparece na próxima consulta
+            return None
+        row = users[0]
+        user = {"id": row["id"], "username": row["username"], "age": row["age"]}
+        profile_cache.set(username, user)
+    return user
+
+
+def invalidate_profile(username):
+    profile_cache.pop(username)
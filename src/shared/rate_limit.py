@@ -0,0 +1,154 @@
+"""
+Limite de taxa em memória (token bucket) para login e endpoints de senha
+
+Cada tentativa de login custa um hash de senha e uma consulta ao banco; um
+ataque de credential stuffing ocuparia todos os workers. enforce() roda no
+início do endpoint, antes de qualquer hash ou I/O, e responde 429 com
+Retry-After quando o cliente passa do limite:
+- por IP do cliente       RATE_LIMIT_IP_PER_MINUTE   (rajada RATE_LIMIT_IP_BURST)
+- por username informado  RATE_LIMIT_USER_PER_MINUTE (rajada RATE_LIMIT_USER_BURST)
+
+Os buckets não ficam em um dict por chave (que cresceria com cada IP ou
+username inventado): ficam em um sketch no estilo count-min, uma grade fixa
+de RATE_LIMIT_SKETCH_DEPTH linhas × RATE_LIMIT_SKETCH_WIDTH células, cada
+célula um token bucket. Uma chave usa uma célula por linha e só passa se
+todas tiverem fichas. Colisões só podem fazer uma chave ser limitada antes
+da hora, nunca depois. A grade é dividida em RATE_LIMIT_SHARDS partes com
+locks independentes. Memória fixa, verificação O(profundidade).
+
+Os limites são por processo (cada worker do launcher tem os seus).
+RATE_LIMIT_ENABLED=0 desliga o limite, por exemplo em testes de carga
+(load_bench.py) que enviam tudo do mesmo IP.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from array import array
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+from metrics import registry
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in ("1", "true", "yes")
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "300"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "60"))
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "30"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "10"))
+RATE_LIMIT_SKETCH_WIDTH = int(os.getenv("RATE_LIMIT_SKETCH_WIDTH", "16384"))
+RATE_LIMIT_SKETCH_DEPTH = int(os.getenv("RATE_LIMIT_SKETCH_DEPTH", "4"))
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+# Atrás de um proxy reverso confiável, o IP do cliente vem do X-Forwarded-For
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "").lower() in ("1", "true", "yes")
+
+rate_limited_total = registry.counter(
+    "rate_limited_total", "Requisições recusadas com 429 pelo limite de taxa", ("scope", "key")
+)
+
+
+class SketchTokenBuckets:
+    """Token buckets aproximados em uma grade fixa (sem estado por chave)"""
+
+    def __init__(
+        self,
+        per_minute,
+        burst,
+        width=RATE_LIMIT_SKETCH_WIDTH,
+        depth=RATE_LIMIT_SKETCH_DEPTH,
+        shards=RATE_LIMIT_SHARDS,
+        clock=time.monotonic,
+    ):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.depth = depth
+        self.shard_width = max(1, width // shards)
+        self.clock = clock
+        cells = depth * self.shard_width
+        # Por shard: lock, fichas de cada célula e instante da última recarga
+        self._shards = [
+            (threading.Lock(), array("d", [burst]) * cells, array("d", [0.0]) * cells)
+            for _ in range(shards)
+        ]
+        self.allowed = 0
+        self.throttled = 0
+
+    def _locate(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        shard = self._shards[h1 % len(self._shards)]
+        h1 //= len(self._shards)
+        width = self.shard_width
+        return shard, [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def acquire(self, key, cost=1.0):
+        """Consome `cost` fichas; retorna 0 se permitido, ou os segundos até haver fichas"""
+        (lock, tokens, stamps), cells = self._locate(key)
+        now = self.clock()
+        with lock:
+            available = self.burst
+            for cell in cells:
+                level = min(self.burst, tokens[cell] + (now - stamps[cell]) * self.rate)
+                tokens[cell] = level
+                stamps[cell] = now
+                available = min(available, level)
+            if available >= cost:
+                for cell in cells:
+                    tokens[cell] -= cost
+                self.allowed += 1
+                return 0.0
+        self.throttled += 1
+        return (cost - available) / self.rate
+
+    def memory_bytes(self):
+        return sum(tokens.itemsize * len(tokens) * 2 for _, tokens, _ in self._shards)
+
+    def stats(self):
+        return {"allowed": self.allowed, "throttled": self.throttled, "memory_bytes": self.memory_bytes()}
+
+
+ip_buckets = SketchTokenBuckets(RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)
+user_buckets = SketchTokenBuckets(RATE_LIMIT_USER_PER_MINUTE, RATE_LIMIT_USER_BURST)
+
+
+def client_ip(request):
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(scope, key, retry_after):
+    rate_limited_total.inc(scope, key)
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def enforce(request, scope, username=None):
+    """
+    Lança HTTPException 429 se o IP (ou o username) passou do limite em `scope`
+
+    Chamar no início do endpoint, antes de hash de senha ou consulta ao banco.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    retry_after = ip_buckets.acquire(f"{scope}:{client_ip(request)}")
+    if retry_after:
+        _reject(scope, "ip", retry_after)
+    if username is not None:
+        retry_after = user_buckets.acquire(f"{scope}:{username.strip().lower()}")
+        if retry_after:
+            _reject(scope, "username", retry_after)
+
+
+def stats():
+    return {"ip": ip_buckets.stats(), "username": user_buckets.stats()}
@@ -0,0 +1,176 @@
+"""
+Refresh tokens com rotação e detecção de reuso
+
+O /login devolve, além do access token (curto), um refresh token opaco.
+Com ele o cliente obtém um novo par em /token/refresh sem reenviar a senha,
+então o hash de senha (bcrypt) só roda no login de fato.
+
+- o banco guarda apenas o SHA-256 do refresh token
+- cada uso consome o token (UPDATE condicional, seguro com requisições
+  concorrentes) e emite outro da mesma família
+- sessão deslizante: cada novo token vale REFRESH_TOKEN_IDLE_MINUTES a
+  partir do uso, limitado a REFRESH_TOKEN_MAX_DAYS desde o login
+- reuso de um token já consumido (ex: token roubado usado depois do cliente
+  legítimo, ou vice-versa) revoga a família inteira: os dois precisam fazer
+  login de novo
+- troca de senha revoga todas as famílias do usuário (revoke_user)
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor
+
+load_dotenv()
+
+REFRESH_TOKEN_IDLE_MINUTES = int(os.getenv("REFRESH_TOKEN_IDLE_MINUTES", str(7 * 24 * 60)))
+REFRESH_TOKEN_MAX_DAYS = int(os.getenv("REFRESH_TOKEN_MAX_DAYS", "30"))
+# Intervalo mínimo entre limpezas dos tokens expirados
+REFRESH_TOKEN_PRUNE_SECONDS = float(os.getenv("REFRESH_TOKEN_PRUNE_SECONDS", "3600"))
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS refresh_tokens (
+        token_hash CHAR(64) PRIMARY KEY,
+        family_id VARCHAR(32) NOT NULL,
+        username VARCHAR(50) NOT NULL,
+        expires_at TIMESTAMPTZ NOT NULL,
+        family_expires_at TIMESTAMPTZ NOT NULL,
+        used_at TIMESTAMPTZ,
+        revoked BOOLEAN NOT NULL DEFAULT FALSE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens (family_id)",
+    "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires_at ON refresh_tokens (expires_at)",
+]
+
+INSERT_TOKEN = """
+    INSERT INTO refresh_tokens (token_hash, family_id, username, expires_at, family_expires_at)
+    VALUES (%s, %s, %s, to_timestamp(%s), to_timestamp(%s))
+"""
+CONSUME_TOKEN = """
+    UPDATE refresh_tokens SET used_at = now()
+    WHERE token_hash = %s AND used_at IS NULL AND NOT revoked AND expires_at > now()
+"""
+LOOKUP_TOKEN = """
+    SELECT username, family_id, EXTRACT(EPOCH FROM family_expires_at) AS family_expires_at,
+           used_at IS NOT NULL AS used, revoked
+    FROM refresh_tokens WHERE token_hash = %s
+"""
+REVOKE_FAMILY = "UPDATE refresh_tokens SET revoked = TRUE WHERE family_id = %s"
+REVOKE_USER = "UPDATE refresh_tokens SET revoked = TRUE WHERE username = %s AND NOT revoked"
+PRUNE_EXPIRED = "DELETE FROM refresh_tokens WHERE expires_at <= now()"
+
+
+class RefreshTokenError(Exception):
+    """Refresh token desconhecido, expirado, revogado ou reutilizado"""
+
+
+class RefreshTokenReused(RefreshTokenError):
+    """Token já consumido apresentado de novo: a família foi revogada"""
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RefreshTokenStore:
+    """Refresh tokens persistidos em `database` (execute_query/execute_update)"""
+
+    def __init__(self, database, idle_minutes=REFRESH_TOKEN_IDLE_MINUTES, max_days=REFRESH_TOKEN_MAX_DAYS):
+        self.database = database
+        self.idle_seconds = idle_minutes * 60
+        self.max_seconds = max_days * 24 * 3600
+        self._schema_ready = False
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+        self.reuse_detected = 0
+
+    def ensure_schema(self):
+        for statement in SCHEMA:
+            self.database.execute_update(statement)
+        self._schema_ready = True
+
+    def _maintenance(self):
+        if not self._schema_ready:
+            self.ensure_schema()
+        with self._lock:
+            due = time.monotonic() - self._last_prune >= REFRESH_TOKEN_PRUNE_SECONDS
+            if due:
+                self._last_prune = time.monotonic()
+        if due:
+            self.database.execute_update(PRUNE_EXPIRED)
+
+    def _new_token(self, username, family_id=None, family_expires_at=None):
+        """Retorna (token em texto, parâmetros do INSERT_TOKEN)"""
+        now = time.time()
+        if family_id is None:
+            family_id = uuid.uuid4().hex
+            family_expires_at = now + self.max_seconds
+        token = secrets.token_urlsafe(32)
+        expires_at = min(now + self.idle_seconds, family_expires_at)
+        return token, (_hash(token), family_id, username, expires_at, family_expires_at)
+
+    def issue(self, username):
+        """Emite o refresh token de uma nova família (login) e retorna o token em texto"""
+        self._maintenance()
+        token, params = self._new_token(username)
+        self.database.execute_update(INSERT_TOKEN, params)
+        return token
+
+    def rotate(self, token):
+        """
+        Consome o token e retorna (username, novo refresh token)
+
+        Consumo e emissão são uma única transação em uma conexão: se o INSERT
+        falhar o token antigo continua válido, em vez de a sessão se perder.
+        """
+        self._maintenance()
+        token_hash = _hash(token)
+        conn = self.database.get_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(CONSUME_TOKEN, (token_hash,))
+                consumed = cursor.rowcount
+                cursor.execute(LOOKUP_TOKEN, (token_hash,))
+                row = cursor.fetchone()
+                if row is None:
+                    raise RefreshTokenError("Unknown refresh token")
+                if not consumed:
+                    if row["used"] and not row["revoked"]:
+                        cursor.execute(REVOKE_FAMILY, (row["family_id"],))
+                        conn.commit()
+                        self.reuse_detected += 1
+                        raise RefreshTokenReused("Refresh token reused")
+                    raise RefreshTokenError("Refresh token expired or revoked")
+                family_expires_at = float(row["family_expires_at"])
+                if family_expires_at <= time.time():
+                    raise RefreshTokenError("Session expired")
+                new_token, params = self._new_token(row["username"], row["family_id"], family_expires_at)
+                cursor.execute(INSERT_TOKEN, params)
+            conn.commit()
+            return row["username"], new_token
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def revoke(self, token):
+        """Revoga a família do token (logout da sessão)"""
+        rows = self.database.execute_query(LOOKUP_TOKEN, (_hash(token),))
+        if rows:
+            self.revoke_family(rows[0]["family_id"])
+
+    def revoke_family(self, family_id):
+        self.database.execute_update(REVOKE_FAMILY, (family_id,))
+
+    def revoke_user(self, username):
+        """Revoga todas as sessões do usuário (ex: depois de trocar a senha)"""
+        self._maintenance()
+        return self.database.execute_update(REVOKE_USER, (username,))
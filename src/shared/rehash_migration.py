@@ -0,0 +1,207 @@
+"""
+Migração em background dos hashes MD5 da tabela users para bcrypt
+
+Como as senhas originais não são conhecidas, cada hash MD5 é "embrulhado":
+o novo valor é bcrypt(md5) no formato $bcrypt-md5$ (ver hashers.py), e
+authenticate_user aceita os dois formatos durante a transição.
+
+A migração:
+- percorre os usuários em chunks ordenados por id (keyset, sem OFFSET)
+- calcula os bcrypt em paralelo em um pool de processos
+- grava cada chunk e o checkpoint na mesma transação (pode ser retomada)
+- limita as linhas por segundo para não competir com o tráfego real
+
+Uso:
+    python src/shared/rehash_migration.py --chunk-size 500 --max-rows-per-sec 200
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from psycopg2.extras import execute_values
+
+from hashers import BCRYPT_ROUNDS, get_hasher
+
+CHECKPOINT_NAME = "md5_to_bcrypt"
+MD5_PATTERN = "^[0-9a-f]{32}$"
+
+
+def wrap_md5(item):
+    """Converte (id, md5) em (id, md5, bcrypt-md5); roda nos processos do pool"""
+    user_id, md5_hex, cost = item
+    return user_id, md5_hex, get_hasher("bcrypt-md5", cost).wrap(md5_hex)
+
+
+class RehashMigration:
+    def __init__(
+        self,
+        db,
+        chunk_size=500,
+        workers=None,
+        cost=BCRYPT_ROUNDS,
+        max_rows_per_sec=None,
+    ):
+        self.db = db
+        self.chunk_size = chunk_size
+        # Por padrão deixa um núcleo livre para o tráfego real
+        self.workers = workers or max(1, (os.cpu_count() or 1) - 1)
+        self.cost = cost
+        self.max_rows_per_sec = max_rows_per_sec
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ensure_schema(self):
+        """Alarga a coluna password (VARCHAR(32) não comporta bcrypt) e cria o checkpoint"""
+        column = self.db.execute_query(
+            """
+            SELECT character_maximum_length FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'users' AND column_name = 'password'
+            """
+        )
+        if column and (column[0]["character_maximum_length"] or 0) < 255:
+            self.db.execute_update("ALTER TABLE users ALTER COLUMN password TYPE VARCHAR(255)")
+        self.db.execute_update(
+            """
+            CREATE TABLE IF NOT EXISTS password_rehash_checkpoint (
+                name VARCHAR(50) PRIMARY KEY,
+                last_id INTEGER NOT NULL DEFAULT 0,
+                migrated BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+            """
+        )
+        self.db.execute_update(
+            "INSERT INTO password_rehash_checkpoint (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+            (CHECKPOINT_NAME,),
+        )
+
+    def load_checkpoint(self):
+        rows = self.db.execute_query(
+            "SELECT last_id, migrated FROM password_rehash_checkpoint WHERE name = %s",
+            (CHECKPOINT_NAME,),
+        )
+        return rows[0]["last_id"], rows[0]["migrated"]
+
+    def reset_checkpoint(self):
+        self.db.execute_update(
+            "UPDATE password_rehash_checkpoint SET last_id = 0, migrated = 0, updated_at = now() WHERE name = %s",
+            (CHECKPOINT_NAME,),
+        )
+
+    def fetch_chunk(self, last_id):
+        return self.db.execute_query(
+            "SELECT id, password FROM users WHERE id > %s AND password ~ %s ORDER BY id LIMIT %s",
+            (last_id, MD5_PATTERN, self.chunk_size),
+        )
+
+    def write_chunk(self, rows, last_id):
+        """Grava o chunk e avança o checkpoint em uma única transação"""
+        conn = self.db.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                # `u.password = v.old` não sobrescreve senhas trocadas durante o chunk
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE users AS u SET password = v.new
+                    FROM (VALUES %s) AS v(id, old, new)
+                    WHERE u.id = v.id AND u.password = v.old
+                    """,
+                    rows,
+                    page_size=len(rows),
+                )
+                updated = cursor.rowcount
+                cursor.execute(
+                    """
+                    UPDATE password_rehash_checkpoint
+                    SET last_id = %s, migrated = migrated + %s, updated_at = now()
+                    WHERE name = %s
+                    """,
+                    (last_id, updated, CHECKPOINT_NAME),
+                )
+            conn.commit()
+            return updated
+        finally:
+            conn.close()
+
+    def run(self, progress=None):
+        """Executa a migração até o fim (ou até stop()); retorna o total migrado"""
+        self.ensure_schema()
+        last_id, migrated = self.load_checkpoint()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                chunk = self.fetch_chunk(last_id)
+                if not chunk:
+                    break
+                items = [(row["id"], row["password"], self.cost) for row in chunk]
+                rows = list(executor.map(wrap_md5, items, chunksize=max(1, len(items) // self.workers)))
+                last_id = chunk[-1]["id"]
+                migrated += self.write_chunk(rows, last_id)
+                if progress:
+                    progress(last_id, migrated)
+                if self.max_rows_per_sec:
+                    # Throttle: espera o tempo mínimo que o chunk deveria levar
+                    min_duration = len(chunk) / self.max_rows_per_sec
+                    self._stop.wait(max(0.0, min_duration - (time.monotonic() - started)))
+        return migrated
+
+    def start(self, progress=None):
+        """Executa a migração em uma thread em background"""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, kwargs={"progress": progress}, name="rehash-migration", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self, wait=True):
+        """Interrompe após o chunk atual; o checkpoint permite retomar depois"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+
+def main(argv=None):
+    import argparse
+
+    from auth_server import db
+
+    parser = argparse.ArgumentParser(description="Migra hashes MD5 da tabela users para bcrypt")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None, help="Processos de hashing")
+    parser.add_argument("--cost", type=int, default=BCRYPT_ROUNDS, help="Rounds do bcrypt")
+    parser.add_argument("--max-rows-per-sec", type=float, default=None, help="Limite de linhas/s")
+    parser.add_argument("--reset", action="store_true", help="Recomeça do início")
+    args = parser.parse_args(argv)
+
+    migration = RehashMigration(
+        db,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        cost=args.cost,
+        max_rows_per_sec=args.max_rows_per_sec,
+    )
+    if args.reset:
+        migration.ensure_schema()
+        migration.reset_checkpoint()
+
+    started = time.monotonic()
+
+    def progress(last_id, migrated):
+        elapsed = time.monotonic() - started
+        print(f"   ✅ id <= {last_id}: {migrated} hashes migrados ({elapsed:.1f}s)")
+
+    print("🔧 Migrando hashes MD5 para bcrypt...")
+    try:
+        total = migration.run(progress)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrompido: execute novamente para continuar do checkpoint")
+        return
+    print(f"🎯 Migração concluída: {total} hashes migrados")
+
+
+if __name__ == "__main__":
+    main()
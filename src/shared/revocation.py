@@ -0,0 +1,219 @@
+"""
+Revogação de tokens JWT (logout) pelo claim `jti`
+
+A tabela revoked_tokens no PostgreSQL é a fonte autoritativa. Como
+is_revoked() roda em toda requisição autenticada (inclusive nos acertos do
+cache de tokens), cada processo mantém um filtro de Bloom com os jti
+revogados ainda não expirados:
+- jti fora do filtro (o caso comum): não revogado, sem I/O
+- jti no filtro (revogado ou falso positivo, ~REVOCATION_BLOOM_ERROR_RATE):
+  confirmado no banco; revogações confirmadas ficam em cache até o `exp`
+
+Uma thread de fundo por processo adiciona ao filtro as revogações feitas
+por outros nós a cada REVOCATION_SYNC_SECONDS e, a cada
+REVOCATION_REBUILD_SECONDS, apaga do banco as entradas de tokens já
+expirados e recria o filtro só com as restantes. O filtro tem tamanho fixo
+(REVOCATION_BLOOM_CAPACITY), então a memória não cresce com o tempo.
+
+Tokens sem `jti` (emitidos antes desta versão) não podem ser revogados.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from cache import TTLCache
+
+load_dotenv()
+
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "300"))
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti VARCHAR(64) PRIMARY KEY,
+        expires_at TIMESTAMPTZ NOT NULL,
+        revoked_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens (revoked_at)",
+    "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens (expires_at)",
+]
+
+
+class BloomFilter:
+    """Filtro de Bloom de tamanho fixo (bits em um bytearray, double hashing)"""
+
+    def __init__(self, capacity=REVOCATION_BLOOM_CAPACITY, error_rate=REVOCATION_BLOOM_ERROR_RATE):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        positions = self._positions(item)
+        # Só a escrita precisa de lock (`|=` em um byte não é atômico); leituras não
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def memory_bytes(self):
+        return len(self._bits)
+
+
+class RevocationStore:
+    """
+    Revogações persistidas em `database` (execute_query/execute_update)
+
+    is_revoked(payload) tem a assinatura do hook de TokenVerifier.
+    """
+
+    def __init__(self, database, sync_interval=REVOCATION_SYNC_SECONDS, rebuild_interval=REVOCATION_REBUILD_SECONDS):
+        self.database = database
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter = BloomFilter()
+        self._confirmed = TTLCache(maxsize=REVOCATION_BLOOM_CAPACITY)
+        # Revogações locais desde a última recriação do filtro
+        self._recent = set()
+        self._recent_lock = threading.Lock()
+        self._synced_until = None
+        self._last_rebuild = float("-inf")
+        self._sync_lock = threading.Lock()
+        self._thread_pid = None
+        self.lookups = 0
+        self.false_positives = 0
+        self.sync_errors = 0
+
+    def ensure_schema(self):
+        for statement in SCHEMA:
+            self.database.execute_update(statement)
+
+    def revoke(self, jti, exp):
+        """Revoga o token `jti` até `exp` (epoch, em segundos)"""
+        self._ensure_started()
+        self.database.execute_update(
+            "INSERT INTO revoked_tokens (jti, expires_at) VALUES (%s, to_timestamp(%s)) ON CONFLICT (jti) DO NOTHING",
+            (jti, exp),
+        )
+        with self._recent_lock:
+            self._filter.add(jti)
+            self._recent.add(jti)
+        self._confirmed.set(jti, True, expires_at=exp)
+
+    def is_revoked(self, payload):
+        jti = payload.get("jti")
+        if jti is None:
+            return False
+        self._ensure_started()
+        if jti not in self._filter:
+            return False
+        if self._confirmed.get(jti):
+            return True
+        # Provável revogação: o banco decide. Se ele falhar a exceção sobe e o
+        # token é rejeitado (nunca aceitar um token possivelmente revogado)
+        self.lookups += 1
+        rows = self.database.execute_query(
+            "SELECT expires_at FROM revoked_tokens WHERE jti = %s AND expires_at > now()", (jti,)
+        )
+        if not rows:
+            self.false_positives += 1
+            return False
+        self._confirmed.set(jti, True, expires_at=payload.get("exp") or time.time() + self.rebuild_interval)
+        return True
+
+    def sync(self):
+        """Traz revogações de outros nós; periodicamente poda e recria o filtro"""
+        with self._sync_lock:
+            if time.monotonic() - self._last_rebuild >= self.rebuild_interval:
+                self.database.execute_update("DELETE FROM revoked_tokens WHERE expires_at <= now()")
+                rows = self.database.execute_query(
+                    "SELECT jti, revoked_at FROM revoked_tokens WHERE expires_at > now()"
+                )
+                bloom = BloomFilter()
+                for row in rows:
+                    bloom.add(row["jti"])
+                with self._recent_lock:
+                    # Revogações locais feitas durante a consulta não podem se perder
+                    for jti in self._recent:
+                        bloom.add(jti)
+                    self._recent.clear()
+                    self._filter = bloom
+                self._last_rebuild = time.monotonic()
+            else:
+                # >= (e não >): revogações com o mesmo revoked_at da última vista
+                rows = self.database.execute_query(
+                    "SELECT jti, revoked_at FROM revoked_tokens"
+                    " WHERE revoked_at >= COALESCE(%s::timestamptz, '-infinity') AND expires_at > now()",
+                    (self._synced_until,),
+                )
+                for row in rows:
+                    self._filter.add(row["jti"])
+            if rows:
+                latest = max(row["revoked_at"] for row in rows)
+                if self._synced_until is None or latest > self._synced_until:
+                    self._synced_until = latest
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception:
+                # Banco indisponível: o filtro atual continua valendo
+                self.sync_errors += 1
+
+    def _ensure_started(self):
+        if self._thread_pid == os.getpid():
+            return
+        # Uma thread por processo (threads não sobrevivem ao fork dos workers)
+        self._thread_pid = os.getpid()
+        self._sync_lock = threading.Lock()
+        # A tabela é criada no /setup (create_test_users), não na requisição
+        try:
+            self.sync()
+        except Exception:
+            self.sync_errors += 1
+        threading.Thread(target=self._sync_loop, name="revocation-sync", daemon=True).start()
+
+    def stats(self):
+        return {
+            "bloom_items": self._filter.count,
+            "bloom_bytes": self._filter.memory_bytes(),
+            "lookups": self.lookups,
+            "false_positives": self.false_positives,
+            "sync_errors": self.sync_errors,
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_revocation_store(database):
+    """Store compartilhado pelos apps do processo que usam o mesmo banco"""
+    key = database.connection_string
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = RevocationStore(database)
+        return store
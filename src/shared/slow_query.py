@@ -0,0 +1,193 @@
+"""
+Log de consultas lentas com captura automática do plano de execução
+
+Toda consulta acima de SLOW_QUERY_MS é registrada (uma linha JSON) com a SQL
+normalizada (fingerprint), os parâmetros redigidos, a duração e o número de
+linhas. Na primeira vez que um fingerprint fica lento, o plano também é
+capturado:
+- PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) para SELECT (EXPLAIN simples para
+  escritas, que o ANALYZE executaria de verdade), em uma thread de fundo
+  com conexão própria e transação desfeita no final
+- SQLite: EXPLAIN QUERY PLAN, barato, na própria conexão
+
+A escrita no arquivo (RotatingFileHandler) é feita por um QueueListener em
+background: a requisição só coloca o registro em uma fila.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from metrics import fingerprint
+
+load_dotenv()
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1").lower() in ("1", "true", "yes")
+# Limite do EXPLAIN ANALYZE, que executa a consulta de novo
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "10000"))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+logger = logging.getLogger("workshop.slow_query")
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+
+_state_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+_explainer = None
+_explained = set()
+
+
+def _start_listener():
+    """Liga o logger a um QueueListener (uma vez por processo, inclusive após fork)"""
+    global _listener, _listener_pid, _explainer
+    with _state_lock:
+        if _listener_pid == os.getpid():
+            return
+        log_queue = queue.SimpleQueue()
+        file_handler = logging.handlers.RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+        _explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        _explained.clear()
+        _listener_pid = os.getpid()
+
+
+def stop():
+    """Termina os EXPLAINs pendentes, esvazia a fila e fecha o arquivo de log"""
+    global _listener, _listener_pid, _explainer
+    with _state_lock:
+        listener, _listener, _listener_pid = _listener, None, None
+        explainer, _explainer = _explainer, None
+    if explainer is not None:
+        # Antes do listener: os EXPLAINs em andamento ainda gravam no log
+        explainer.shutdown(wait=True)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop)
+
+
+def redact(params):
+    """Troca os valores dos parâmetros pelo tipo (e tamanho, para textos)"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redact(value) for value in params]
+    if isinstance(params, str):
+        return f"<str:{len(params)}>"
+    return f"<{type(params).__name__}>"
+
+
+def _emit(entry):
+    logger.warning(json.dumps(entry, default=str))
+
+
+def _first_time_slow(fp):
+    with _state_lock:
+        if fp in _explained:
+            return False
+        _explained.add(fp)
+        return True
+
+
+def log_if_slow(db, sql, params, seconds, rows=None, explainer=None, source=None, background=False):
+    """
+    Registra a consulta se passou do limite
+
+    `explainer(source)` cria a função `explain(sql, params)` que retorna o
+    plano. Ela só é criada quando o plano vai ser capturado, então o caminho
+    rápido (consulta abaixo do limite) não aloca nada. Com background=True o
+    plano é capturado em uma thread de fundo (o EXPLAIN ANALYZE executa a
+    consulta de novo).
+    """
+    duration_ms = seconds * 1000
+    if duration_ms < SLOW_QUERY_MS:
+        return
+    _start_listener()
+    fp = fingerprint(sql)
+    entry = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "db": db,
+        "fingerprint": fp,
+        "duration_ms": round(duration_ms, 3),
+        "rows": rows,
+        "params": redact(params),
+    }
+    if explainer is None or not SLOW_QUERY_EXPLAIN or not _first_time_slow(fp):
+        _emit(entry)
+        return
+    explain = explainer(source)
+
+    def capture():
+        try:
+            # Literais no plano (ex: filtros com os parâmetros) também são redigidos
+            entry["plan"] = _STRING_LITERAL.sub("'?'", explain(sql, params))
+        except Exception as e:
+            entry["plan_error"] = f"{type(e).__name__}: {e}"
+        _emit(entry)
+
+    executor = _explainer
+    if background and executor is not None:
+        executor.submit(capture)
+    else:
+        capture()
+
+
+def postgres_explainer(database):
+    """EXPLAIN para DatabaseConnection/Database: usa uma conexão própria do pool"""
+
+    def explain(sql, params):
+        analyze = sql.lstrip().upper().startswith(("SELECT", "WITH"))
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        conn = database.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", (SLOW_QUERY_EXPLAIN_TIMEOUT_MS,))
+                cursor.execute(prefix + sql, params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            conn.rollback()
+            conn.close()
+
+    return explain
+
+
+def sqlite_explainer(connection, cursor_factory=sqlite3.Cursor):
+    """EXPLAIN QUERY PLAN na conexão SQLite (cursor sem instrumentação)"""
+
+    def explain(sql, params):
+        cursor = connection.cursor(cursor_factory)
+        try:
+            rows = cursor.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        finally:
+            cursor.close()
+        return "\n".join(row[-1] for row in rows)
+
+    return explain
@@ -0,0 +1,53 @@
+"""
+Serialização incremental de resultados para StreamingResponse
+
+Os geradores recebem um iterável de linhas (ex: DatabaseConnection.stream_query)
+e produzem o corpo da resposta em blocos de ~STREAM_CHUNK_BYTES, então a
+memória usada não depende do número de linhas:
+- ndjson_lines        um objeto JSON por linha (application/x-ndjson)
+- json_object_chunks  {"<key>": [...]}, o mesmo formato de um JSON comum
+"""
+
+import json
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", "65536"))
+
+
+def _dumps(row):
+    return json.dumps(row, default=str, separators=(",", ":"))
+
+
+def _buffered(parts, chunk_bytes):
+    """Agrupa pedaços pequenos em blocos maiores (menos escritas no socket)"""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_bytes:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def ndjson_lines(rows, chunk_bytes=STREAM_CHUNK_BYTES):
+    return _buffered((_dumps(row) + "\n" for row in rows), chunk_bytes)
+
+
+def json_object_chunks(key, rows, chunk_bytes=STREAM_CHUNK_BYTES):
+    def parts():
+        yield f"{{{json.dumps(key)}:["
+        separator = ""
+        for row in rows:
+            yield separator + _dumps(row)
+            separator = ","
+        yield "]}"
+
+    return _buffered(parts(), chunk_bytes)
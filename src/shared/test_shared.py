@@ -0,0 +1,926 @@
+import pytest
+import asyncio
+import sys
+import os
+import time
+from unittest.mock import patch
+
+# Adiciona o diretório shared ao path para importar módulos compartilhados
+sys.path.append(os.path.dirname(__file__))
+# Raiz do projeto: ferramentas de linha de comando (password_audit.py, ...)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(PROJECT_ROOT)
+
+from psycopg2 import extensions
+
+import pool as pool_module
+from pool import ConnectionPool, PoolTimeout
+from async_db import AsyncDatabase, QueryTimeout, install_timeout_handler
+from cache import TTLCache
+from jwt_verifier import TokenVerifier
+from hash_service import HashingService, HashQueueFull, HashTimeout
+from hashers import calibrate, get_hasher, identify_hasher, verify_password
+from streaming import json_object_chunks, ndjson_lines
+import json
+import jwt
+
+
+class FakeConnection:
+    """Conexão psycopg2 falsa para testar o pool sem PostgreSQL"""
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.info = type("Info", (), {"transaction_status": extensions.TRANSACTION_STATUS_IDLE})()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connect():
+    with patch.object(pool_module.psycopg2, "connect", side_effect=lambda dsn: FakeConnection()) as mock_connect:
+        yield mock_connect
+
+
+class TestConnectionPool:
+    def test_reuses_connections(self, fake_connect):
+        pool = ConnectionPool("dsn", min_size=0, max_size=2)
+        conn = pool.checkout()
+        raw = conn._conn
+        conn.close()
+        assert pool.checkout()._conn is raw
+        assert fake_connect.call_count == 1
+        assert pool.stats()["checkouts"] == 2
+
+    def test_timeout_when_exhausted(self, fake_connect):
+        pool = ConnectionPool("dsn", min_size=0, max_size=1, timeout=0.01)
+        pool.getconn()
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+        stats = pool.stats()
+        assert stats["waits"] == 1
+        assert stats["timeouts"] == 1
+
+    def test_rolls_back_and_discards(self, fake_connect):
+        pool = ConnectionPool("dsn", min_size=0, max_size=2)
+        conn = pool.getconn()
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        assert conn.rollbacks == 1
+
+        conn = pool.getconn()
+        conn.closed = 1
+        pool.putconn(conn)
+        assert pool.stats()["discarded"] == 1
+        assert pool.stats()["size"] == 0
+
+    def test_opens_min_size_up_front(self, fake_connect):
+        pool = ConnectionPool("dsn", min_size=2, max_size=3)
+        assert fake_connect.call_count == 2
+        assert pool.stats()["idle"] == 2
+        pool.getconn()
+        assert fake_connect.call_count == 2
+
+    def test_recycles_idle_connections(self, fake_connect):
+        pool = ConnectionPool("dsn", min_size=1, max_size=3, max_idle=0)
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+        pool.getconn()
+        assert first.closed
+        assert pool.stats()["recycled"] == 1
+
+
+class SlowDatabase:
+    def execute_query(self, query, params=None):
+        time.sleep(params[0])
+        return [{"query": query}]
+
+
+class TestAsyncDatabase:
+    def test_queries_run_concurrently(self):
+        async_db = AsyncDatabase(SlowDatabase(), max_workers=4)
+
+        async def run():
+            return await asyncio.gather(
+                *[async_db.execute_query("SELECT 1", (0.2,)) for _ in range(4)]
+            )
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        assert len(results) == 4
+        assert time.monotonic() - start < 0.6
+
+    def test_per_call_timeout(self):
+        async_db = AsyncDatabase(SlowDatabase(), max_workers=1)
+        with pytest.raises(QueryTimeout):
+            asyncio.run(async_db.execute_query("SELECT 1", (0.2,), timeout=0.01))
+
+    def test_timeout_becomes_504(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = install_timeout_handler(FastAPI())
+        async_db = AsyncDatabase(SlowDatabase(), max_workers=1)
+
+        @app.get("/slow")
+        async def slow():
+            return await async_db.execute_query("SELECT 1", (0.2,), timeout=0.01)
+
+        response = TestClient(app).get("/slow")
+        assert response.status_code == 504
+
+
+class TestTTLCache:
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_entries_are_not_served(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1, expires_at=time.time() - 1)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+
+class TestTokenVerifier:
+    SECRET = "test-secret-with-at-least-32-bytes!!"
+
+    def test_cache_hits_and_misses(self):
+        verifier = TokenVerifier(self.SECRET, "HS256")
+        token = jwt.encode({"sub": "alice", "exp": int(time.time()) + 60}, self.SECRET, algorithm="HS256")
+        assert verifier.decode(token)["sub"] == "alice"
+        assert verifier.decode(token)["sub"] == "alice"
+        stats = verifier.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_expired_token_is_not_served_from_cache(self):
+        verifier = TokenVerifier(self.SECRET, "HS256")
+        token = jwt.encode({"sub": "alice", "exp": int(time.time()) + 1}, self.SECRET, algorithm="HS256")
+        verifier.decode(token)
+        with patch("time.time", return_value=time.time() + 5):
+            verifier.decode(token)
+        stats = verifier.stats()
+        assert stats["hits"] == 0
+        assert stats["expirations"] == 1
+
+    def test_revoked_token_rejected_from_cache(self):
+        revoked = set()
+        verifier = TokenVerifier(self.SECRET, "HS256", is_revoked=lambda payload: payload["sub"] in revoked)
+        token = jwt.encode({"sub": "alice"}, self.SECRET, algorithm="HS256")
+        verifier.decode(token)
+        revoked.add("alice")
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.decode(token)
+
+
+class TestJWTKeys:
+    @pytest.mark.parametrize("algorithm", ["ES256", "EdDSA"])
+    def test_rotation_keeps_old_tokens_valid(self, tmp_path, algorithm):
+        from jwt_keys import PublicKeyCache, SigningKeys
+
+        keys = SigningKeys(algorithm, directory=str(tmp_path))
+        old_token = keys.sign({"sub": "alice"})
+        keys.rotate()
+        new_token = keys.sign({"sub": "bob"})
+        assert jwt.get_unverified_header(new_token)["kid"] == keys.active_kid != jwt.get_unverified_header(old_token)["kid"]
+
+        verifier = TokenVerifier(None, algorithm, public_keys=PublicKeyCache(keys.public_keys))
+        assert verifier.decode(old_token)["sub"] == "alice"
+        assert verifier.decode(new_token)["sub"] == "bob"
+
+    def test_unknown_kid_is_rejected(self, tmp_path):
+        from jwt_keys import PublicKeyCache, SigningKeys
+
+        trusted = SigningKeys("ES256", directory=str(tmp_path / "trusted"))
+        attacker = SigningKeys("ES256", directory=str(tmp_path / "attacker"))
+        verifier = TokenVerifier(None, "ES256", public_keys=PublicKeyCache(trusted.public_keys))
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.decode(attacker.sign({"sub": "alice"}))
+
+    def test_new_kid_is_picked_up_in_background(self, tmp_path):
+        from jwt_keys import PublicKeyCache, SigningKeys
+
+        keys = SigningKeys("ES256", directory=str(tmp_path))
+        cache = PublicKeyCache(
+            lambda: SigningKeys("ES256", directory=str(tmp_path), create=False).public_keys(),
+            refresh_interval=3600, min_refresh_interval=0,
+        )
+        verifier = TokenVerifier(None, "ES256", public_keys=cache)
+        verifier.warm()
+        assert cache.refreshes == 1
+        keys.rotate()
+        token = keys.sign({"sub": "alice"})
+        # A requisição não espera pelo JWKS: recusa e acorda a thread de atualização
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.decode(token)
+        deadline = time.monotonic() + 5
+        while cache.refreshes < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert verifier.decode(token)["sub"] == "alice"
+
+    def test_token_right_after_startup_is_accepted(self, tmp_path, monkeypatch):
+        import auth_server
+        import jwt_keys
+        from fastapi.testclient import TestClient
+        from profile_cache import profile_cache
+
+        # Diretório de chaves vazio: a primeira chave nasce no startup
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(jwt_keys, "JWKS_URL", None)
+        monkeypatch.setattr(jwt_keys, "_signing_keys", {})
+        monkeypatch.setattr(jwt_keys, "_public_keys", {})
+        monkeypatch.setattr(auth_server, "JWT_ALGORITHM", "ES256")
+        verifier = TokenVerifier(None, "ES256", public_keys=jwt_keys.get_public_keys("ES256"))
+        monkeypatch.setattr(auth_server, "token_verifier", verifier)
+        profile_cache.set("alice", {"id": 1, "username": "alice", "age": 30})
+        try:
+            with TestClient(auth_server.build_auth_server()) as client:
+                token = auth_server.create_access_token("alice")
+                response = client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        finally:
+            profile_cache.pop("alice")
+        assert response.status_code == 200
+        assert response.json()["username"] == "alice"
+
+    def test_jwks_round_trip(self, tmp_path):
+        from jwt_keys import SigningKeys
+
+        keys = SigningKeys("EdDSA", directory=str(tmp_path))
+        jwk, = keys.jwks()["keys"]
+        assert jwk["kid"] == keys.active_kid and "d" not in jwk
+        public_key = jwt.PyJWK(jwk, "EdDSA").key
+        assert jwt.decode(keys.sign({"sub": "alice"}), public_key, algorithms=["EdDSA"])["sub"] == "alice"
+
+
+class FakeRevocationDatabase:
+    """Banco falso com a tabela revoked_tokens em um dict (jti -> expires_at)"""
+
+    connection_string = "fake-revocation"
+
+    def __init__(self):
+        self.rows = {}
+        self.queries = 0
+
+    def execute_update(self, query, params=None):
+        if query.startswith("INSERT INTO revoked_tokens"):
+            jti, exp = params
+            self.rows.setdefault(jti, exp)
+        return 1
+
+    def execute_query(self, query, params=None):
+        self.queries += 1
+        if "WHERE jti = %s" in query:
+            return [{"expires_at": self.rows[params[0]]}] if params[0] in self.rows else []
+        return [{"jti": jti, "revoked_at": 0} for jti in self.rows]
+
+
+class TestRevocation:
+    def test_bloom_filter_has_no_false_negatives(self):
+        from revocation import BloomFilter
+
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+    def test_revoked_token_is_rejected_and_others_skip_the_database(self):
+        from revocation import RevocationStore
+
+        database = FakeRevocationDatabase()
+        store = RevocationStore(database)
+        secret = TestTokenVerifier.SECRET
+        verifier = TokenVerifier(secret, "HS256", is_revoked=store.is_revoked)
+        exp = int(time.time()) + 60
+        revoked = jwt.encode({"sub": "alice", "jti": "a" * 32, "exp": exp}, secret, algorithm="HS256")
+        valid = jwt.encode({"sub": "bob", "jti": "b" * 32, "exp": exp}, secret, algorithm="HS256")
+        verifier.decode(revoked)
+
+        store.revoke("a" * 32, exp)
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.decode(revoked)
+        queries = database.queries
+        for _ in range(100):
+            assert verifier.decode(valid)["sub"] == "bob"
+        # "Não revogado" é resolvido pelo filtro, sem consultar o banco
+        assert database.queries == queries
+
+
+class FakeRefreshDatabase:
+    """Banco falso para refresh_tokens: interpreta as consultas do módulo"""
+
+    def __init__(self):
+        self.rows = {}
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute_update(self, query, params=None):
+        import refresh_tokens as rt
+
+        if query == rt.INSERT_TOKEN:
+            token_hash, family_id, username, expires_at, family_expires_at = params
+            self.rows[token_hash] = {
+                "family_id": family_id, "username": username, "expires_at": expires_at,
+                "family_expires_at": family_expires_at, "used": False, "revoked": False,
+            }
+            return 1
+        if query == rt.CONSUME_TOKEN:
+            row = self.rows.get(params[0])
+            if row and not row["used"] and not row["revoked"] and row["expires_at"] > time.time():
+                row["used"] = True
+                return 1
+            return 0
+        if query in (rt.REVOKE_FAMILY, rt.REVOKE_USER):
+            field = "family_id" if query == rt.REVOKE_FAMILY else "username"
+            matched = [row for row in self.rows.values() if row[field] == params[0] and not row["revoked"]]
+            for row in matched:
+                row["revoked"] = True
+            return len(matched)
+        return 0
+
+    def execute_query(self, query, params=None):
+        row = self.rows.get(params[0])
+        return [dict(row)] if row else []
+
+    def get_connection(self):
+        return FakeRefreshConnection(self)
+
+
+class FakeRefreshConnection:
+    """Conexão do FakeRefreshDatabase (sem isolamento: só conta commits e rollbacks)"""
+
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = -1
+        self.result = []
+
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        import refresh_tokens as rt
+
+        if query == rt.LOOKUP_TOKEN:
+            self.result = self.database.execute_query(query, params)
+        else:
+            self.rowcount = self.database.execute_update(query, params)
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def commit(self):
+        self.database.commits += 1
+
+    def rollback(self):
+        self.database.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class TestRefreshTokens:
+    def test_rotation_issues_new_token_without_password(self):
+        from refresh_tokens import RefreshTokenError, RefreshTokenStore
+
+        store = RefreshTokenStore(FakeRefreshDatabase())
+        first = store.issue("alice")
+        username, second = store.rotate(first)
+        assert username == "alice" and second != first
+        assert store.rotate(second)[0] == "alice"
+        with pytest.raises(RefreshTokenError):
+            store.rotate("token-desconhecido")
+
+    def test_reuse_revokes_the_whole_family(self):
+        from refresh_tokens import RefreshTokenError, RefreshTokenReused, RefreshTokenStore
+
+        store = RefreshTokenStore(FakeRefreshDatabase())
+        stolen = store.issue("alice")
+        _, current = store.rotate(stolen)
+        with pytest.raises(RefreshTokenReused):
+            store.rotate(stolen)
+        # O token mais recente da família também deixa de valer
+        with pytest.raises(RefreshTokenError):
+            store.rotate(current)
+
+    def test_rotation_rolls_back_when_issuing_fails(self):
+        from refresh_tokens import RefreshTokenStore
+
+        database = FakeRefreshDatabase()
+        store = RefreshTokenStore(database)
+        token = store.issue("alice")
+        with patch.object(store, "_new_token", side_effect=RuntimeError("insert falhou")):
+            with pytest.raises(RuntimeError):
+                store.rotate(token)
+        # O consumo não foi confirmado: o banco real desfaz o UPDATE
+        assert (database.commits, database.rollbacks) == (0, 1)
+
+    def test_revoke_user_ends_every_session(self):
+        from refresh_tokens import RefreshTokenError, RefreshTokenStore
+
+        store = RefreshTokenStore(FakeRefreshDatabase())
+        sessions = [store.issue("alice"), store.issue("alice")]
+        other = store.issue("bob")
+        assert store.revoke_user("alice") == 2
+        for token in sessions:
+            with pytest.raises(RefreshTokenError):
+                store.rotate(token)
+        assert store.rotate(other)[0] == "bob"
+
+    def test_sliding_expiry_is_capped_by_session_age(self):
+        from refresh_tokens import RefreshTokenStore
+
+        database = FakeRefreshDatabase()
+        store = RefreshTokenStore(database, idle_minutes=60, max_days=1)
+        store.issue("alice")
+        row, = database.rows.values()
+        assert row["expires_at"] - time.time() == pytest.approx(3600, abs=5)
+        assert row["family_expires_at"] - time.time() == pytest.approx(86400, abs=5)
+
+
+class TestRateLimit:
+    def test_bucket_refills_over_time(self):
+        from rate_limit import SketchTokenBuckets
+
+        now = [0.0]
+        buckets = SketchTokenBuckets(per_minute=60, burst=3, width=64, shards=4, clock=lambda: now[0])
+        assert [buckets.acquire("ip:1") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert buckets.acquire("ip:1") == pytest.approx(1.0)
+        # Outras chaves têm os seus próprios buckets
+        assert buckets.acquire("ip:2") == 0.0
+        now[0] += 1.0
+        assert buckets.acquire("ip:1") == 0.0
+
+    def test_memory_is_bounded_by_the_sketch(self):
+        from rate_limit import SketchTokenBuckets
+
+        buckets = SketchTokenBuckets(per_minute=60, burst=5, width=1024, depth=4, shards=8)
+        before = buckets.memory_bytes()
+        for i in range(20000):
+            buckets.acquire(f"user:{i}")
+        assert buckets.memory_bytes() == before == 1024 * 4 * 8 * 2
+
+    def test_login_over_limit_gets_429_with_retry_after(self, monkeypatch):
+        import auth_server
+        import rate_limit
+        from fastapi.testclient import TestClient
+
+        monkeypatch.setattr(rate_limit, "user_buckets", rate_limit.SketchTokenBuckets(per_minute=1, burst=2))
+        client = TestClient(auth_server.build_auth_server())
+        with patch.object(auth_server, "authenticate_user", return_value=None) as authenticate:
+            statuses = [
+                client.post("/login", json={"username": "victim", "password": "guess"}).status_code
+                for _ in range(3)
+            ]
+        assert statuses == [401, 401, 429]
+        # A tentativa recusada não chegou ao hash de senha
+        assert authenticate.call_count == 2
+        response = client.post("/login", json={"username": "Victim", "password": "guess"})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+
+def slow_square(value, delay):
+    time.sleep(delay)
+    return value * value
+
+
+def crash_worker():
+    os._exit(1)
+
+
+class TestHashingService:
+    def test_runs_in_worker_process(self):
+        service = HashingService(workers=2, max_pending=4, timeout=5)
+        try:
+            assert asyncio.run(service.run(slow_square, 3, 0)) == 9
+        finally:
+            service.shutdown()
+
+    def test_bounded_queue_and_timeout(self):
+        service = HashingService(workers=1, max_pending=1, timeout=5)
+        try:
+            service.submit(slow_square, 2, 0.3)
+            with pytest.raises(HashQueueFull):
+                service.submit(slow_square, 2, 0)
+            time.sleep(0.5)
+            with pytest.raises(HashTimeout):
+                asyncio.run(service.run(slow_square, 2, 0.3, timeout=0.01))
+        finally:
+            service.shutdown()
+
+    def test_recovers_from_dead_worker(self):
+        from concurrent.futures.process import BrokenProcessPool
+
+        service = HashingService(workers=1, max_pending=4, timeout=5)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                asyncio.run(service.run(crash_worker))
+            # O pool quebrado foi descartado: o próximo job usa um novo
+            assert asyncio.run(service.run(slow_square, 3, 0)) == 9
+            assert service.stats()["pending"] == 0
+        finally:
+            service.shutdown()
+
+
+class TestHashers:
+    def test_unknown_user_still_pays_a_hash(self):
+        import auth_server
+        import hashers
+
+        with patch.object(auth_server.db, "execute_query", return_value=[]), \
+                patch.object(hashers, "verify_password", wraps=hashers.verify_password) as verify:
+            assert auth_server.authenticate_user("ninguem", "senha") is None
+        verify.assert_called_once()
+        assert identify_hasher(verify.call_args[0][1]).name == hashers.PASSWORD_HASHER
+
+    def test_hashes_are_self_describing(self):
+        for name, cost in [("md5", None), ("bcrypt", 4), ("scrypt", 10)]:
+            hashed = get_hasher(name, cost).hash("alice123")
+            assert identify_hasher(hashed).name == name
+            assert verify_password("alice123", hashed)
+            assert not verify_password("wrong", hashed)
+
+    def test_unknown_format_is_rejected(self):
+        assert not verify_password("alice123", "not-a-hash")
+
+    def test_calibration_respects_budget(self):
+        chosen, results = calibrate("bcrypt", target_ms=30, samples=1)
+        assert chosen["p99_ms"] <= 30
+        assert chosen["hashes_per_sec_per_core"] > 0
+        assert results[0]["cost"] == 4
+
+
+class TestStreaming:
+    rows = [{"username": f"user{i}", "password": "x" * 32} for i in range(1000)]
+
+    def test_json_chunks_keep_response_shape(self):
+        chunks = list(json_object_chunks("users", iter(self.rows), chunk_bytes=4096))
+        assert len(chunks) > 1
+        assert all(len(chunk) < 4096 + 100 for chunk in chunks)
+        assert json.loads(b"".join(chunks)) == {"users": self.rows}
+
+    def test_empty_result_is_valid_json(self):
+        assert json.loads(b"".join(json_object_chunks("users", iter([])))) == {"users": []}
+
+    def test_ndjson_one_row_per_line(self):
+        body = b"".join(ndjson_lines(iter(self.rows), chunk_bytes=4096)).decode()
+        assert [json.loads(line) for line in body.splitlines()] == self.rows
+
+
+class TestRehashMigration:
+    def test_wrapped_md5_still_verifies(self):
+        from rehash_migration import wrap_md5
+
+        md5_hex = get_hasher("md5").hash("alice123")
+        user_id, old, wrapped = wrap_md5((1, md5_hex, 4))
+        assert (user_id, old) == (1, md5_hex)
+        assert wrapped.startswith("$bcrypt-md5$")
+        assert verify_password("alice123", wrapped)
+        assert not verify_password("bob123", wrapped)
+
+    def test_authenticate_user_accepts_both_formats(self):
+        import auth_server
+
+        for stored in [get_hasher("md5").hash("alice123"), get_hasher("bcrypt-md5", 4).hash("alice123")]:
+            row = {"id": 1, "username": "alice", "age": 30, "password": stored}
+            with patch.object(auth_server.db, "execute_query", return_value=[row]):
+                assert auth_server.authenticate_user("alice", "alice123") == {"id": 1, "username": "alice", "age": 30}
+                assert auth_server.authenticate_user("alice", "wrong") is None
+
+
+class TestMetrics:
+    def test_fingerprint_normalizes_literals(self):
+        from metrics import fingerprint
+
+        assert fingerprint("SELECT * FROM users WHERE username = 'alice' AND id = 3") == \
+            fingerprint("SELECT *  FROM users\n WHERE username = %s AND id = %s")
+        assert fingerprint("SELECT id FROM t WHERE id IN (?, ?, ?)") == "SELECT id FROM t WHERE id IN (?)"
+
+    def test_fingerprint_labels_are_capped(self):
+        from metrics import FingerprintLimiter
+
+        limiter = FingerprintLimiter(maxsize=2)
+        assert [limiter.label(value) for value in ("a", "b", "c", "a")] == ["a", "b", "other", "a"]
+
+    def test_histogram_exposition_is_cumulative(self):
+        from metrics import Registry
+
+        histogram = Registry().histogram("test_seconds", "teste", ("op",), buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 5.0):
+            histogram.observe(seconds, "x")
+        lines = list(histogram.samples())
+        assert 'test_seconds_bucket{op="x",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{op="x",le="1.0"} 2' in lines
+        assert 'test_seconds_bucket{op="x",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{op="x"} 3' in lines
+
+    def test_middleware_labels_by_route_template(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from metrics import install_metrics
+
+        app = install_metrics(FastAPI(title="metrics-test"))
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            return {"id": item_id}
+
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+        body = client.get("/metrics").text
+        assert 'http_requests_total{app="metrics-test",method="GET",route="/items/{item_id}",status="200"} 2' in body
+
+
+class TestSlowQueryLog:
+    def test_slow_query_logged_with_plan_once(self, tmp_path, monkeypatch):
+        import json
+        import sqlite3
+        import slow_query
+
+        log_file = tmp_path / "slow.log"
+        monkeypatch.setattr(slow_query, "SLOW_QUERY_MS", 0)
+        monkeypatch.setattr(slow_query, "SLOW_QUERY_LOG", str(log_file))
+        slow_query.stop()
+
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)")
+        sql = "SELECT * FROM users WHERE username = ?"
+        explainer = slow_query.sqlite_explainer
+        try:
+            slow_query.log_if_slow("sqlite", sql, ("alice",), 0.5, 1, explainer=explainer, source=conn)
+            slow_query.log_if_slow("sqlite", sql, ("bob",), 0.5, 0, explainer=explainer, source=conn)
+        finally:
+            slow_query.stop()
+
+        first, second = [json.loads(line) for line in log_file.read_text().splitlines()]
+        assert first["fingerprint"] == "SELECT * FROM users WHERE username = ?"
+        assert first["params"] == ["<str:5>"]
+        assert first["duration_ms"] == 500.0
+        assert "users" in first["plan"]
+        # O plano só é capturado na primeira vez que o fingerprint fica lento
+        assert "plan" not in second
+        assert "alice" not in log_file.read_text()
+
+    def test_fast_query_is_not_logged(self, tmp_path, monkeypatch):
+        import slow_query
+
+        monkeypatch.setattr(slow_query, "SLOW_QUERY_LOG", str(tmp_path / "slow.log"))
+        slow_query.stop()
+        slow_query.log_if_slow("sqlite", "SELECT 1", None, 0.0)
+        assert not (tmp_path / "slow.log").exists()
+
+
+class TestFastJSON:
+    def test_trusted_response_projects_model_fields(self, monkeypatch):
+        import fast_json
+        from auth import User
+
+        monkeypatch.setattr(fast_json, "FAST_JSON", True)
+        row = {"id": 1, "username": "alice", "age": 30, "password": "hash"}
+        response = fast_json.trusted_response(row, User)
+        assert json.loads(response.body) == {"id": 1, "username": "alice", "age": 30}
+
+    def test_disabled_falls_back_to_model(self, monkeypatch):
+        import fast_json
+        from auth import User
+
+        monkeypatch.setattr(fast_json, "FAST_JSON", False)
+        user = fast_json.trusted_response({"id": 1, "username": "alice", "age": 30}, User)
+        assert user == User(id=1, username="alice", age=30)
+
+    def test_dumps_handles_database_types(self):
+        import datetime
+        import decimal
+        from fast_json import dumps
+
+        encoded = dumps({"price": decimal.Decimal("9.5"), "at": datetime.date(2024, 1, 2), "nome": "ação"})
+        assert json.loads(encoded) == {"price": 9.5, "at": "2024-01-02", "nome": "ação"}
+
+
+class TestLauncher:
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requer os.fork")
+    def test_pools_are_reset_after_fork(self):
+        sentinel = object()
+        pool_module._pools["dsn-fork-test"] = sentinel
+        try:
+            pid = os.fork()
+            if pid == 0:
+                ok = "dsn-fork-test" not in pool_module._pools and sentinel in pool_module._inherited_pools
+                os._exit(0 if ok else 1)
+            _, status = os.waitpid(pid, 0)
+            assert os.WEXITSTATUS(status) == 0
+            assert pool_module._pools["dsn-fork-test"] is sentinel
+        finally:
+            pool_module._pools.pop("dsn-fork-test", None)
+
+    def test_respawn_policy(self):
+        from launcher import Launcher
+
+        launcher = Launcher("a01", workers=1, host="127.0.0.1", port=0)
+        recycled, failed = 0, 1 << 8
+        assert launcher.respawn_delay(recycled, 1.0) == 0.0
+        # Erro logo após o fork: falha de inicialização, não recria
+        assert launcher.respawn_delay(failed, 0.1) is None
+        # Quedas depois da inicialização: espera crescente
+        assert [launcher.respawn_delay(failed, 60.0) for _ in range(3)] == [0.5, 1.0, 2.0]
+
+    def test_every_app_has_a_loader(self):
+        from launcher import APPS
+
+        for relative_path, _, _ in APPS.values():
+            assert os.path.exists(os.path.join(os.path.dirname(__file__), "..", relative_path))
+
+
+class TestGateway:
+    def test_mounts_apps_with_same_file_names(self):
+        from fastapi.testclient import TestClient
+        import gateway
+
+        mounts = [
+            ("/a01", "a01_access_control/server.py", "app"),
+            ("/a01-secure", "a01_access_control/solution.py", "create_secure_app"),
+        ]
+        with TestClient(gateway.create_gateway(mounts)) as client:
+            assert client.get("/").json()["aplicacoes"] == {"/a01": "/a01/docs", "/a01-secure": "/a01-secure/docs"}
+            assert client.get("/a01/openapi.json").status_code == 200
+            # Sem token: o HTTPBearer da aplicação montada responde
+            assert client.get("/a01-secure/profile", params={"username": "alice"}).status_code == 403
+
+        assert "workshop_a01_access_control_server" in sys.modules
+        assert "workshop_a01_access_control_solution" in sys.modules
+
+
+class TestPasswordAudit:
+    def test_ranges_cover_the_file_and_end_on_newlines(self, tmp_path):
+        from password_audit import split_ranges
+
+        wordlist = tmp_path / "words.txt"
+        data = b"".join(f"senha{i}\n".encode() for i in range(100))
+        wordlist.write_bytes(data)
+        ranges = split_ranges(str(wordlist), chunk_bytes=64)
+        assert len(ranges) > 1
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start and data[end - 1:end] == b"\n"
+
+    def test_counts_and_matches_on_a_tiny_wordlist(self, tmp_path):
+        import hashlib
+        from password_audit import run_audit
+
+        md5 = lambda password: hashlib.md5(password.encode()).hexdigest()  # noqa: E731
+        export = tmp_path / "export.ndjson"
+        export.write_text("\n".join(json.dumps(user) for user in [
+            {"username": "alice", "password": md5("alice123")},
+            {"username": "bob", "password": md5("bob123")},
+            {"username": "carol", "password": md5("alice123")},
+            {"username": "dave", "password": "$2b$12$naoemd5naoentranaauditoria"},
+        ]))
+        wordlist = tmp_path / "words.txt"
+        wordlist.write_bytes(b"123456\r\nalice123\n\nqwerty\nbob123")
+        report = run_audit(str(export), str(wordlist), workers=2, chunk_bytes=8)
+        assert report["targets"] == 2
+        assert report["hashed"] == 4
+        assert report["matches"] == {"alice123": ["alice", "carol"], "bob123": ["bob"]}
+
+
+class TestSeedData:
+    @staticmethod
+    def _dump(path):
+        import sqlite3
+
+        conn = sqlite3.connect(path)
+        try:
+            users = conn.execute("SELECT username, password, email FROM users ORDER BY id").fetchall()
+            products = conn.execute(
+                "SELECT name, category, price, description FROM products ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+        return users, products
+
+    def test_same_seed_gives_the_same_sqlite_rows(self, tmp_path):
+        from seed_data import seed_sqlite
+
+        dumps = []
+        for name in ("a.db", "b.db"):
+            path = str(tmp_path / name)
+            seed_sqlite(path, users=200, products=300, seed=7, distinct=50, batch_size=64, truncate=False)
+            dumps.append(self._dump(path))
+        assert dumps[0] == dumps[1]
+        users, products = dumps[0]
+        assert sum(1 for username, _, _ in users if username.startswith("seed_7_")) == 200
+        assert sum(1 for *_, description in products if description.endswith("(seed 7)")) == 300
+
+    def test_truncate_replaces_the_rows_of_the_seed(self, tmp_path):
+        from seed_data import seed_sqlite
+
+        path = str(tmp_path / "a.db")
+        seed_sqlite(path, users=50, products=50, seed=7, distinct=20, batch_size=16, truncate=False)
+        first = self._dump(path)
+        seed_sqlite(path, users=50, products=50, seed=7, distinct=20, batch_size=16, truncate=True)
+        users, products = self._dump(path)
+        assert len(users) == len(first[0]) and len(products) == len(first[1])
+        assert [row[1:] for row in users] == [row[1:] for row in first[0]]
+
+        other = str(tmp_path / "b.db")
+        seed_sqlite(other, users=50, products=50, seed=8, distinct=20, batch_size=16, truncate=False)
+        assert self._dump(other)[1][-50:] != first[1][-50:]
+
+    def test_narrow_password_column_fails_before_copy(self):
+        from seed_data import check_password_column
+
+        class FakeCursor:
+            def __init__(self, width):
+                self.width = width
+
+            def execute(self, sql, params=None):
+                pass
+
+            def fetchone(self):
+                return (self.width,)
+
+        with pytest.raises(ValueError, match="VARCHAR\\(32\\)"):
+            check_password_column(FakeCursor(32), "bcrypt", 4)
+        check_password_column(FakeCursor(32), "md5", None)
+        check_password_column(FakeCursor(255), "bcrypt", 4)
+
+
+class TestLoadBench:
+    @staticmethod
+    def _recorder(latencies, errors=0, throttled=0):
+        from load_bench import Recorder
+
+        recorder = Recorder()
+        for latency in latencies:
+            recorder.record(latency)
+        for _ in range(errors):
+            recorder.record(0, error="timeout")
+        recorder.throttled = throttled
+        return recorder
+
+    def test_percentiles_on_canned_samples(self):
+        # 1..100 ms fora de ordem: o percentil p é exatamente p ms (nearest-rank)
+        latencies = [float(ms) for ms in range(100, 0, -1)]
+        summary = self._recorder(latencies, errors=2, throttled=3).summary(elapsed=10)
+        assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"], summary["max_ms"]) == (50, 95, 99, 100)
+        assert summary["mean_ms"] == 50.5
+        assert summary["requests"] == 105 and summary["ok"] == 100
+        assert summary["throttled"] == 3 and summary["errors"] == {"timeout": 2}
+        assert summary["ok_rps"] == 10.0
+        assert sum(summary["histogram"].values()) == 100
+
+    def test_small_and_empty_samples(self):
+        summary = self._recorder([7.0]).summary(elapsed=1)
+        assert summary["p50_ms"] == summary["p99_ms"] == summary["max_ms"] == 7.0
+        empty = self._recorder([], throttled=4).summary(elapsed=0)
+        assert empty["p50_ms"] is None and empty["mean_ms"] is None
+        assert empty["requests"] == 4 and empty["ok_rps"] == 0.0
+
+    def test_merge_adds_latencies_errors_and_throttled(self):
+        total = self._recorder([1.0, 2.0], errors=1, throttled=1)
+        total.merge(self._recorder([3.0], errors=2, throttled=5))
+        summary = total.summary(elapsed=1)
+        assert summary["ok"] == 3 and summary["errors"] == {"timeout": 3} and summary["throttled"] == 6
+
+    def test_compare_with_json_baseline(self, tmp_path, capsys):
+        from load_bench import print_report
+
+        def report(latencies, elapsed):
+            summary = self._recorder(latencies).summary(elapsed)
+            return {
+                "config": {"mode": "closed"},
+                "elapsed_s": elapsed,
+                "total": summary,
+                "scenarios": {"me": summary},
+            }
+
+        saved = tmp_path / "run.json"
+        saved.write_text(json.dumps(report([10.0] * 100, elapsed=10)))
+        baseline = json.loads(saved.read_text())
+        print_report(report([5.0] * 100, elapsed=5), baseline)
+        out = capsys.readouterr().out
+        assert "ok_rps" in out and "+100.0%" in out
+        assert "p50_ms" in out and "-50.0%" in out
+        assert "429" in out and "RATE_LIMIT_ENABLED" not in out